@@ -17,9 +17,22 @@ Usage:
     >>> baseline_obj.validate_pkg() # Optional
 """
 
-__version__:      str = "1.7.1"
+__version__:      str = "1.8.0"
 __author__:       str = "RIPEDA Consulting"
 __author_email__: str = "info@ripeda.com"
 
 
-from .core import BaselineBuilder
\ No newline at end of file
+def __getattr__(name: str):
+    """
+    Resolve heavy attributes on first use (PEP 562).
+    Keeps 'import baseline' and the CLI's help menu free of requests/macos_pkg_builder.
+    """
+    if name == "BaselineBuilder":
+        from .core import BaselineBuilder
+        globals()[name] = BaselineBuilder
+        return BaselineBuilder
+    if name == "DownloadCoordinator":
+        from .downloads import DownloadCoordinator
+        globals()[name] = DownloadCoordinator
+        return DownloadCoordinator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
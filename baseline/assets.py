@@ -0,0 +1,253 @@
+"""
+assets.py: Lossless asset optimization for Baseline Builder.
+
+Shrinks images embedded in the pkg without altering how they render:
+- PNG: Metadata chunks are dropped and image data is recompressed at maximum zlib effort.
+- ICNS: Legacy bitmap representations superseded by a modern one of the same size are dropped,
+        and embedded PNG representations are recompressed.
+- Duplicate files are collapsed into a single copy.
+
+Results are cached by digest of both input and output, so repeat builds, and passes over
+already optimized files, skip recompression entirely.
+"""
+
+import zlib
+import struct
+import hashlib
+import logging
+import tempfile
+
+from pathlib import Path
+
+from . import tracing
+
+
+# Bump when optimization output changes, invalidating cached results.
+OPTIMIZER_VERSION: str = "1"
+
+PNG_SIGNATURE: bytes = b"\x89PNG\r\n\x1a\n"
+
+# Ancillary chunks that don't affect rendering.
+# 'iDOT' is Apple's parallel decoding index, which references IDAT offsets invalidated by recompression.
+PNG_DISCARDABLE_CHUNKS: list = [b"tEXt", b"zTXt", b"iTXt", b"tIME", b"iDOT", b"dSIG"]
+
+# Animated PNGs interleave frame data with IDAT, leave as-is.
+PNG_UNSUPPORTED_CHUNKS: list = [b"acTL", b"fcTL", b"fdAT"]
+
+# Legacy ICNS representations, keyed by the modern representations of the same size superseding them.
+ICNS_SUPERSEDED_TYPES: dict = {
+    b"is32": [b"icp4", b"ic04"],
+    b"s8mk": [b"icp4", b"ic04"],
+    b"ics#": [b"icp4", b"ic04"],
+    b"ics4": [b"icp4", b"ic04"],
+    b"ics8": [b"icp4", b"ic04"],
+    b"il32": [b"icp5", b"ic05"],
+    b"l8mk": [b"icp5", b"ic05"],
+    b"ICN#": [b"icp5", b"ic05"],
+    b"icl4": [b"icp5", b"ic05"],
+    b"icl8": [b"icp5", b"ic05"],
+    b"ICON": [b"icp5", b"ic05"],
+    b"it32": [b"ic07"],
+    b"t8mk": [b"ic07"],
+}
+
+
+def optimize_png(data: bytes) -> bytes:
+    """
+    Losslessly recompress a PNG, returning the original if no smaller.
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        return data
+
+    chunks = []
+    image  = b""
+    offset = len(PNG_SIGNATURE)
+    while offset + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[offset:offset + 8])
+        chunk_data = data[offset + 8:offset + 8 + length]
+        offset += 12 + length
+
+        if chunk_type in PNG_UNSUPPORTED_CHUNKS:
+            return data
+        if chunk_type in PNG_DISCARDABLE_CHUNKS:
+            continue
+        if chunk_type == b"IDAT":
+            # Merge all IDAT chunks, written back as one in place of the first.
+            if image == b"":
+                chunks.append((b"IDAT", None))
+            image += chunk_data
+            continue
+
+        chunks.append((chunk_type, chunk_data))
+        if chunk_type == b"IEND":
+            break
+
+    try:
+        raw = zlib.decompress(image)
+    except zlib.error:
+        return data
+
+    compressed = image
+    for strategy in [zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED]:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+        candidate  = compressor.compress(raw) + compressor.flush()
+        if len(candidate) < len(compressed):
+            compressed = candidate
+
+    result = PNG_SIGNATURE
+    for chunk_type, chunk_data in chunks:
+        if chunk_data is None:
+            chunk_data = compressed
+        result += struct.pack(">I4s", len(chunk_data), chunk_type) + chunk_data + struct.pack(">I", zlib.crc32(chunk_type + chunk_data) & 0xFFFFFFFF)
+
+    return result if len(result) < len(data) else data
+
+
+def optimize_icns(data: bytes) -> bytes:
+    """
+    Drop superseded representations and recompress embedded PNGs, returning the original if no smaller.
+    """
+    if data[:4] != b"icns":
+        return data
+
+    entries = []
+    offset  = 8
+    while offset + 8 <= len(data):
+        entry_type, length = struct.unpack(">4sI", data[offset:offset + 8])
+        if length < 8:
+            return data
+        entries.append((entry_type, data[offset + 8:offset + length]))
+        offset += length
+
+    types = [entry_type for entry_type, _ in entries]
+
+    result_entries = []
+    for entry_type, entry_data in entries:
+        if entry_type in ICNS_SUPERSEDED_TYPES and any(modern in types for modern in ICNS_SUPERSEDED_TYPES[entry_type]):
+            continue
+        if entry_data.startswith(PNG_SIGNATURE):
+            entry_data = optimize_png(entry_data)
+        result_entries.append((entry_type, entry_data))
+
+    # Table of contents lists each entry's size, regenerate to match.
+    if any(entry_type == b"TOC " for entry_type, _ in result_entries):
+        toc = b"".join(struct.pack(">4sI", entry_type, len(entry_data) + 8) for entry_type, entry_data in result_entries if entry_type != b"TOC ")
+        result_entries = [(entry_type, toc if entry_type == b"TOC " else entry_data) for entry_type, entry_data in result_entries]
+
+    body   = b"".join(struct.pack(">4sI", entry_type, len(entry_data) + 8) + entry_data for entry_type, entry_data in result_entries)
+    result = struct.pack(">4sI", b"icns", len(body) + 8) + body
+
+    return result if len(result) < len(data) else data
+
+
+class AssetOptimizer:
+
+    def __init__(self, cache_directory: str) -> None:
+        """
+        Parameters:
+            cache_directory: Directory to store optimized results in, keyed by input digest.
+        """
+        self.cache_directory = Path(cache_directory)
+
+
+    def _optimize_data(self, data: bytes, suffix: str) -> bytes:
+        """
+        Optimize file contents, reusing cached result if available.
+        Results are also cached under their own digest, so already optimized files
+        (ex. restaged in watch mode) are hits rather than recompressed.
+        """
+        handlers = {
+            ".png":  optimize_png,
+            ".icns": optimize_icns,
+        }
+        if suffix not in handlers:
+            return data
+
+        cached = self._cache_path(data, suffix)
+        if cached.exists():
+            tracing.current_span().set_attribute("cache", "hit")
+            return cached.read_bytes()
+
+        tracing.current_span().set_attribute("cache", "miss")
+        result = handlers[suffix](data)
+
+        self._store(cached, result)
+        self._store(self._cache_path(result, suffix), result)
+
+        return result
+
+
+    def _cache_path(self, data: bytes, suffix: str) -> Path:
+        return self.cache_directory / f"{hashlib.sha256(data).hexdigest()}-{OPTIMIZER_VERSION}{suffix}"
+
+
+    def _store(self, cached: Path, data: bytes) -> None:
+        """
+        Write to a unique file first, avoids partial reads by concurrent builders.
+        """
+        if cached.exists():
+            return
+        self.cache_directory.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=self.cache_directory, delete=False) as file:
+            file.write(data)
+        Path(file.name).replace(cached)
+
+
+    @tracing.traced
+    def optimize_file(self, file: str) -> tuple:
+        """
+        Optimize file in place.
+        Returns size before and after optimization.
+        """
+        data   = Path(file).read_bytes()
+        result = self._optimize_data(data, Path(file).suffix.lower())
+
+        tracing.current_span().set_attribute("file", Path(file).name)
+        tracing.current_span().set_attribute("size", len(data))
+        tracing.current_span().set_attribute("saved", len(data) - len(result))
+
+        if result != data:
+            with open(file, "wb") as output:
+                output.write(result)
+
+        return len(data), len(result)
+
+
+    @tracing.traced
+    def optimize_directory(self, directory: str) -> tuple:
+        """
+        Collapse duplicates and optimize every file in directory.
+
+        Returns:
+            Dictionary of removed duplicate file names to the file name they duplicate.
+            Dictionary of file names to size before and after optimization (0 for removed duplicates).
+        """
+        duplicates = {}
+        savings    = {}
+        digests    = {}
+
+        for file in sorted(Path(directory).iterdir()):
+            if not file.is_file():
+                continue
+            digest = hashlib.sha256(file.read_bytes()).hexdigest()
+            if digest in digests:
+                duplicates[file.name] = digests[digest]
+                savings[file.name]    = (file.stat().st_size, 0)
+                logging.info(f"    Collapsing duplicate: {file.name} -> {digests[digest]} ({file.stat().st_size} bytes saved)")
+                file.unlink()
+                continue
+            digests[digest] = file.name
+
+        for file in sorted(Path(directory).iterdir()):
+            if not file.is_file():
+                continue
+            savings[file.name] = self.optimize_file(file)
+            before, after = savings[file.name]
+            if before != after:
+                logging.info(f"    Optimized: {file.name}: {before} -> {after} bytes ({before - after} bytes saved)")
+
+        total_before = sum(before for before, _ in savings.values())
+        total_after  = sum(after  for _, after  in savings.values())
+        logging.info(f"  Saved {total_before - total_after} of {total_before} bytes")
+
+        return duplicates, savings
@@ -5,7 +5,7 @@ Entry point for manual invocation.
 import logging
 import argparse
 
-from . import __version__, BaselineBuilder
+from . import __version__
 
 
 def main():
@@ -21,6 +21,14 @@ def main():
         '   (pkg and mobileconfig positions can be swapped)',
         '>>> python3 baseline.py --validate RIPEDA.pkg',
         '   (will resolve to embedded config)',
+        '>>> python3 baseline.py --validate RIPEDA.pkg --fast',
+        '   (verifies against embedded digest manifest, without extracting)',
+        '',
+        '- Rebuild whenever the configuration or any referenced file changes:',
+        '>>> python3 baseline.py --build ripeda.plist --watch',
+        '',
+        '- Record tracing spans (Chrome trace-event JSON, or JSON lines if .jsonl):',
+        '>>> python3 baseline.py --build ripeda.plist --trace trace.json',
     ]
 
     logging.basicConfig(
@@ -32,15 +40,34 @@ def main():
     parser = argparse.ArgumentParser(description='Build a baseline from a configuration file or validate existing pkg.', add_help=False)
     parser.add_argument('-b', '--build',    metavar='CONFIGURATION')
     parser.add_argument('-v', '--validate', metavar=('CONFIGURATION', 'PKG'), nargs='+')
+    parser.add_argument('-f', '--fast',     action="store_true",)
+    parser.add_argument('-w', '--watch',    action="store_true",)
+    parser.add_argument('-t', '--trace',    metavar='OUTPUT')
     parser.add_argument('-h', '--help',     action="store_true",)
 
     args = parser.parse_args()
 
+    if args.trace is not None:
+        # Tracer is process wide, exported on exit.
+        from . import tracing
+        tracing.start(args.trace)
+
+    if args.build is not None or args.validate is not None:
+        # Deferred, avoids loading requests/macos_pkg_builder for help menu.
+        from . import BaselineBuilder
+
     if args.build is not None:
         baseline_obj = BaselineBuilder(configuration_file=args.build)
 
+        if args.watch is True:
+            try:
+                baseline_obj.watch()
+            except KeyboardInterrupt:
+                logging.info("Stopped watching.")
+            return
+
         baseline_obj.build()
-        baseline_obj.validate_pkg()
+        baseline_obj.validate_pkg(fast=args.fast)
 
     if args.validate is not None:
         pkg_arg    = args.validate[0]
@@ -54,7 +81,7 @@ def main():
             config_arg = ".plist"
 
         baseline_obj = BaselineBuilder(configuration_file=config_arg)
-        baseline_obj.validate_pkg(pkg=pkg_arg)
+        baseline_obj.validate_pkg(pkg=pkg_arg, fast=args.fast)
 
     if args.help is True:
         for line in help_menu:
@@ -3,23 +3,28 @@ core.py: Core module for Baseline Builder.
 """
 
 import os
+import re
+import uuid
+import time
 import shlex
+import hashlib
 import logging
 import plistlib
 import tempfile
-import requests
-import subprocess
-import macos_pkg_builder
 
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
-from . import __version__
+from . import __version__, tracing, manifest
+from .assets import AssetOptimizer
+from .watch import FileWatcher
+from .releases import ReleaseResolver
+from .downloads import DownloadCoordinator, FetchedAsset
 
 BIN_CP:      str = "/bin/cp"
 BIN_CHMOD:   str = "/bin/chmod"
 BIN_MD5:     str = "/sbin/md5"
 BIN_TAR:     str = "/usr/bin/tar"
-BIN_CURL:    str = "/usr/bin/curl"
 BIN_GREP:    str = "/usr/bin/grep"
 BIN_UNZIP:   str = "/usr/bin/unzip"
 BIN_XATTR:   str = "/usr/bin/xattr"
@@ -29,10 +34,31 @@ BIN_PKGUTIL: str = "/usr/sbin/pkgutil"
 BASELINE_ZIP_CACHE:              str = ""
 SWIFTDIALOG_PKG_CACHE:           str = ""
 INSTALLOMATOR_PKG_CACHE:         str = ""
-INSTALLOMATOR_SUPPORTED_LABELS: list = []
 
 DOWNLOAD_CACHE: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
 
+# Shared by all builders unless one is provided, deduplicates downloads across threads.
+DOWNLOAD_COORDINATOR: DownloadCoordinator = DownloadCoordinator(DOWNLOAD_CACHE.name)
+
+# Output flavours supported by build_flavours().
+FLAVOUR_PLIST:                     str = "plist"
+FLAVOUR_MOBILECONFIG:              str = "mobileconfig"
+FLAVOUR_PLIST_DISTRIBUTION:        str = "plist-distribution"
+FLAVOUR_MOBILECONFIG_DISTRIBUTION: str = "mobileconfig-distribution"
+
+SUPPORTED_FLAVOURS: list = [
+    FLAVOUR_PLIST,
+    FLAVOUR_MOBILECONFIG,
+    FLAVOUR_PLIST_DISTRIBUTION,
+    FLAVOUR_MOBILECONFIG_DISTRIBUTION,
+]
+
+# Optimized assets, keyed by digest of the original. Persisted between builds.
+ASSET_CACHE_DIRECTORY: str = str(Path.home() / "Library" / "Caches" / "Baseline-Builder" / "Assets")
+
+# PayloadType used when generating a mobileconfig from a plist configuration.
+BASELINE_PAYLOAD_TYPE: str = "com.secondsonconsulting.baseline"
+
 class BaselineBuilder:
 
     def __init__(
@@ -58,6 +84,15 @@ class BaselineBuilder:
             simple_mdm_icon:       str = None,
 
             embed_versioning:      bool = True,
+
+            download_coordinator:  DownloadCoordinator = None,
+
+            optimize_assets:      bool = False,
+            asset_cache:           str = ASSET_CACHE_DIRECTORY,
+
+            release_resolver:      ReleaseResolver = None,
+
+            embed_manifest:       bool = True,
         ) -> None:
 
         self.configuration_file = configuration_file
@@ -67,7 +102,9 @@ class BaselineBuilder:
         self.version    = version
         self.output     = output
 
-        self._build_directory      = tempfile.TemporaryDirectory()
+        self._download_coordinator = download_coordinator if download_coordinator is not None else DOWNLOAD_COORDINATOR
+
+        self._build_directory      = self._download_coordinator.workspace()
         self._build_directory_path = Path(self._build_directory.name)
 
         self._build_pkg_path             = Path(self._build_directory_path / "Packages")
@@ -93,10 +130,30 @@ class BaselineBuilder:
 
         self._github_token = github_token
 
+        if release_resolver is None:
+            release_resolver = ReleaseResolver(token=github_token if github_token != "" else os.environ.get("GITHUB_TOKEN", ""))
+        self._release_resolver = release_resolver
+
         self._simple_mdm_icon = simple_mdm_icon
 
         self._embed_versioning = embed_versioning
 
+        self._optimize_assets = optimize_assets
+        self._asset_cache     = asset_cache
+
+        # Source file to staged copy, for rebuilding only what changed in watch mode.
+        self._resolved_files = {}
+
+        # Whether Baseline, swiftDialog and Installomator are in the build directory, fetched once per build directory.
+        self._components_fetched = False
+
+        # Results keyed by path and stat signature, skipping re-hashing of unchanged files.
+        self._md5_cache     = {}
+        self._sha256_cache  = {}
+        self._team_id_cache = {}
+
+        self._embed_manifest = embed_manifest
+
         self._baseline_resolved_version      = None
         self._swiftdialog_resolved_version   = None
         self._installomator_resolved_version = None
@@ -109,18 +166,39 @@ class BaselineBuilder:
             self._installomator_resolved_version = installomator_version
 
 
-    def _fetch_api_content(self, url: str) -> requests.Response:
+    def _fetch_api_content(self, url: str) -> "requests.Response":
         """
         Fetch content, if GitHub link and token available, use them.
         """
-        if "api.github.com" not in url:
-            return requests.get(url)
-        if self._github_token != "":
-            return requests.get(url, headers={"Authorization": f"token {self._github_token}"})
-        if "GITHUB_TOKEN" not in os.environ:
-            return requests.get(url)
+        import requests
+
+        with tracing.span("_fetch_api_content", url=url) as span:
+            if "api.github.com" not in url:
+                result = requests.get(url)
+            elif self._github_token != "":
+                result = requests.get(url, headers={"Authorization": f"token {self._github_token}"})
+            elif "GITHUB_TOKEN" not in os.environ:
+                result = requests.get(url)
+            else:
+                result = requests.get(url, headers={"Authorization": f"token {os.environ['GITHUB_TOKEN']}"})
 
-        return requests.get(url, headers={"Authorization": f"token {os.environ['GITHUB_TOKEN']}"})
+            span.set_attribute("status_code", result.status_code)
+            span.set_attribute("size", len(result.content))
+            return result
+
+
+    def _fetch_release(self, api_url: str, component: str) -> dict:
+        """
+        Fetch GitHub release metadata.
+        Shared between builders through the download coordinator, so each release is only requested once.
+        """
+        def _fetch() -> dict:
+            result = self._fetch_api_content(api_url)
+            if result.status_code != 200:
+                raise Exception(f"Unable to fetch {component} from GitHub: {result.status_code}")
+            return result.json()
+
+        return self._download_coordinator.single_flight(("release", api_url), _fetch)
 
 
     def _resolve_baseline_download_url(self, version: str) -> str:
@@ -131,16 +209,9 @@ class BaselineBuilder:
         if version.startswith("branch: "):
             return f"https://github.com/secondsonconsulting/Baseline/archive/refs/heads/{version.replace('branch: ', '')}.zip"
 
-        if version == "latest":
-            api_url = f"https://api.github.com/repos/secondsonconsulting/Baseline/releases/latest"
-        else:
-            api_url = f"https://api.github.com/repos/secondsonconsulting/Baseline/releases/tags/{version}"
-
-        result = self._fetch_api_content(api_url)
-        if result.status_code != 200:
-            raise Exception(f"Unable to fetch Baseline from GitHub: {result.status_code}")
+        api_url = self._release_resolver.release_url("secondsonconsulting/Baseline", version)
 
-        result = result.json()
+        result = self._fetch_release(api_url, "Baseline")
         if "zipball_url" not in result:
             raise Exception(f"No zipball_url in GitHub response: {result}")
 
@@ -149,6 +220,7 @@ class BaselineBuilder:
         return result["zipball_url"]
 
 
+    @tracing.traced(component="Baseline")
     def _fetch_baseline(self, version: str) -> None:
         """
         Fetch Baseline from GitHub.
@@ -157,29 +229,26 @@ class BaselineBuilder:
 
         logging.info(f"Fetching Baseline: {version}...")
 
-        search_paths = [
-            DOWNLOAD_CACHE.name + "/Baseline.zip",
-            "Baseline.zip"
-        ]
-
-        for path in search_paths:
-            if Path(path).exists():
-                logging.info(f"  Using existing Baseline.zip: {path}")
-                subprocess.run([BIN_CP, "-c", path, self._build_directory_path])
-                break
+        if Path("Baseline.zip").exists():
+            logging.info(f"  Using existing Baseline.zip")
+            tracing.run([BIN_CP, "-c", "Baseline.zip", self._build_directory_path])
 
         asset_url = ""
+        tracing.current_span().set_attribute("cache", "hit")
         if Path(f"{self._build_directory_path}/Baseline.zip").exists() is False:
             logging.info("  No cached pkg for Baseline, fetching from GitHub...")
+            tracing.current_span().set_attribute("cache", "miss")
 
             asset_url = self._resolve_baseline_download_url(version)
 
-            subprocess.run([BIN_CURL, "-s", "-L", "-o", "Baseline.zip", asset_url], cwd=DOWNLOAD_CACHE.name)
-            subprocess.run([BIN_CP, "-c", "Baseline.zip", self._build_directory_path], cwd=DOWNLOAD_CACHE.name)
+            cached = self._download_coordinator.fetch(asset_url, "Baseline.zip")
+            self._stage_fetched_asset(cached, self._build_directory_path / "Baseline.zip")
+
+        tracing.current_span().set_attribute("size", tracing.file_size(self._build_directory_path / "Baseline.zip"))
 
         # Unzip the baseline zip into Baseline folder.
         logging.info(f"  Unzipping...")
-        result = subprocess.run([BIN_UNZIP, "-q", "Baseline.zip"], cwd=self._build_directory_path)
+        result = tracing.run([BIN_UNZIP, "-q", "Baseline.zip"], cwd=self._build_directory_path)
         if result.returncode != 0:
             error_message = "Unable to unzip Baseline.zip"
             if asset_url != "":
@@ -212,83 +281,78 @@ class BaselineBuilder:
             self._baseline_configuration = Path(self.output).parent / Path(Path(self.configuration_file).stem + "-resolved.mobileconfig")
 
 
+    @tracing.traced(component="swiftDialog")
     def _fetch_swift_dialog(self, version: str) -> None:
         """
         Fetch swiftDialog from GitHub.
         Use local copy if available.
         """
 
-        if version == "latest":
-            api_url = f"https://api.github.com/repos/swiftDialog/swiftDialog/releases/latest"
-        else:
-            api_url = f"https://api.github.com/repos/swiftDialog/swiftDialog/releases/tags/{version}"
+        api_url = self._release_resolver.release_url("swiftDialog/swiftDialog", version)
 
         logging.info(f"Fetching swiftDialog: {version}...")
 
         if not self._build_pkg_path.exists():
             self._build_pkg_path.mkdir()
 
-        for path in [DOWNLOAD_CACHE.name + "/swiftDialog.pkg", "swiftDialog.pkg"]:
-            if Path(path).exists():
-                logging.info(f"  Using existing swiftDialog.pkg: {path}")
-                subprocess.run([BIN_CP, "-c", path, self._build_pkg_path])
-                break
+        if Path("swiftDialog.pkg").exists():
+            logging.info(f"  Using existing swiftDialog.pkg")
+            tracing.run([BIN_CP, "-c", "swiftDialog.pkg", self._build_pkg_path])
 
+        tracing.current_span().set_attribute("cache", "hit")
         if Path(f"{self._build_pkg_path}/swiftDialog.pkg").exists() is False:
             logging.info("  No cached pkg for swiftDialog, fetching from GitHub...")
-            result = self._fetch_api_content(api_url)
-            if result.status_code != 200:
-                raise Exception(f"Unable to fetch swiftDialog from GitHub: {result.status_code}")
-            result = result.json()
+            tracing.current_span().set_attribute("cache", "miss")
+            result = self._fetch_release(api_url, "swiftDialog")
             if "assets" not in result:
                 raise Exception(f"No assets in GitHub response: {result}")
             if len(result["assets"]) <= 0:
                 raise Exception(f"No assets in GitHub response: {result}")
             if "browser_download_url" not in result["assets"][0]:
                 raise Exception(f"No browser_download_url in GitHub response: {result}")
-            subprocess.run([BIN_CURL, "-s", "-L", "-o", "swiftDialog.pkg", result["assets"][0]["browser_download_url"]], cwd=DOWNLOAD_CACHE.name)
-            subprocess.run([BIN_CP, "-c", "swiftDialog.pkg", self._build_pkg_path], cwd=DOWNLOAD_CACHE.name)
+            cached = self._download_coordinator.fetch(result["assets"][0]["browser_download_url"], "swiftDialog.pkg")
+            self._stage_fetched_asset(cached, self._build_pkg_path / "swiftDialog.pkg")
 
             self._swiftdialog_version = result["tag_name"]
 
+        tracing.current_span().set_attribute("size", tracing.file_size(self._build_pkg_path / "swiftDialog.pkg"))
+
 
+    @tracing.traced(component="Installomator")
     def _fetch_installomator(self, version: str) -> None:
         """
         Fetch Installomator from GitHub.
         Use local copy if available.
         """
 
-        if version == "latest":
-            api_url = f"https://api.github.com/repos/Installomator/Installomator/releases/latest"
-        else:
-            api_url = f"https://api.github.com/repos/Installomator/Installomator/releases/tags/{version}"
+        api_url = self._release_resolver.release_url("Installomator/Installomator", version)
 
         logging.info(f"Fetching Installomator: {version}...")
 
-        for path in [DOWNLOAD_CACHE.name + "/Installomator.pkg", "Installomator.pkg"]:
-            if Path(path).exists():
-                logging.info(f"  Using existing Installomator.pkg: {path}")
-                subprocess.run([BIN_CP, "-c", path, self._build_pkg_path])
-                break
+        if Path("Installomator.pkg").exists():
+            logging.info(f"  Using existing Installomator.pkg")
+            tracing.run([BIN_CP, "-c", "Installomator.pkg", self._build_pkg_path])
 
+        tracing.current_span().set_attribute("cache", "hit")
         if Path(f"{self._build_pkg_path}/Installomator.pkg").exists() is False:
             logging.info("  No cached pkg for Installomator, fetching from GitHub...")
-            result = self._fetch_api_content(api_url)
-            if result.status_code != 200:
-                raise Exception(f"Unable to fetch Installomator from GitHub: {result.status_code}")
-            result = result.json()
+            tracing.current_span().set_attribute("cache", "miss")
+            result = self._fetch_release(api_url, "Installomator")
             if "assets" not in result:
                 raise Exception(f"No assets in GitHub response: {result}")
             if len(result["assets"]) <= 0:
                 raise Exception(f"No assets in GitHub response: {result}")
             if "browser_download_url" not in result["assets"][0]:
                 raise Exception(f"No browser_download_url in GitHub response: {result}")
-            subprocess.run([BIN_CURL, "-s", "-L", "-o", "Installomator.pkg", result["assets"][0]["browser_download_url"]], cwd=DOWNLOAD_CACHE.name)
-            subprocess.run([BIN_CP, "-c", "Installomator.pkg", self._build_pkg_path], cwd=DOWNLOAD_CACHE.name)
+            cached = self._download_coordinator.fetch(result["assets"][0]["browser_download_url"], "Installomator.pkg")
+            self._stage_fetched_asset(cached, self._build_pkg_path / "Installomator.pkg")
 
             self._installomator_version = result["tag_name"]
 
+        tracing.current_span().set_attribute("size", tracing.file_size(self._build_pkg_path / "Installomator.pkg"))
 
+
+    @tracing.traced
     def _resolve_file(self, file: str, variant: str, ignore_if_missing: bool = False) -> str:
         """
         Attempt to resolve the icon path and copy it to the build directory.
@@ -318,13 +382,25 @@ class BaselineBuilder:
         if file.startswith("/usr/local/Baseline/"):
             file = file.replace("/usr/local/Baseline/", "")
 
+        span = tracing.current_span()
+        span.set_attribute("file", Path(file).name)
+        span.set_attribute("variant", variant)
+
+        if Path(file).is_file():
+            self._resolved_files[str(Path(file).absolute())] = local_destination / Path(file).name
+
         # Check if we already have the icon.
         if (local_destination / Path(file).name).exists():
+            span.set_attribute("cache", "hit")
+            span.set_attribute("size", tracing.file_size(local_destination / Path(file).name))
             return str(production_destination + "/" + Path(file).name)
 
+        span.set_attribute("cache", "miss")
+
         # Check if a copy exists next to us
         if (Path(file)).exists():
-            subprocess.run([BIN_CP, "-ac", file, local_destination])
+            span.set_attribute("size", tracing.file_size(file))
+            tracing.run([BIN_CP, "-ac", file, local_destination])
             return str(production_destination + "/" + Path(file).name)
 
         if ignore_if_missing is True:
@@ -333,6 +409,34 @@ class BaselineBuilder:
         raise Exception(f"Unable to resolve file: {file}")
 
 
+    def _stage_fetched_asset(self, asset: FetchedAsset, destination: Path) -> None:
+        """
+        Clone a downloaded asset into the build directory.
+        Digests gathered during download are recorded against the copy, so it's never read back in full.
+        Flat pkgs have their signature checked once per download, shared between builders.
+        """
+        tracing.run([BIN_CP, "-c", asset.path, destination])
+
+        signature = self._file_signature(destination)
+        self._md5_cache[signature]    = asset.md5
+        self._sha256_cache[signature] = asset.sha256
+        if asset.is_flat_pkg is True:
+            self._team_id_cache[signature] = self._download_coordinator.single_flight(
+                ("team-id", asset.sha256),
+                lambda: self._check_signature(str(asset.path)),
+            )
+
+
+    def _file_signature(self, file: str) -> tuple:
+        """
+        Identify a file's contents by path, modification time and size.
+        Inode is omitted, as restaged copies ('cp -a') preserve the rest.
+        """
+        stat = Path(file).stat()
+        return (str(Path(file).absolute()), stat.st_mtime_ns, stat.st_size)
+
+
+    @tracing.traced
     def _calculate_md5(self, file: str) -> str:
         """
         Calculate the MD5 of a file.
@@ -340,9 +444,56 @@ class BaselineBuilder:
         logging.info(f"    Calculating MD5 for: {Path(file).name}...")
         if file.startswith("/usr/local/Baseline/"):
             file = file.replace("/usr/local/Baseline", f"{self._build_directory_path}")
-        return subprocess.run([BIN_MD5, "-q", file], capture_output=True).stdout.decode("utf-8").strip()
+        tracing.current_span().set_attribute("file", Path(file).name)
+        tracing.current_span().set_attribute("size", tracing.file_size(file))
+
+        signature = self._file_signature(file) if Path(file).exists() else None
+        if signature in self._md5_cache:
+            tracing.current_span().set_attribute("cache", "hit")
+            return self._md5_cache[signature]
+
+        result = tracing.run([BIN_MD5, "-q", file], capture_output=True).stdout.decode("utf-8").strip()
+        if signature is not None:
+            self._md5_cache[signature] = result
+        return result
+
+
+    @tracing.traced
+    def _calculate_sha256(self, file: str) -> str:
+        """
+        Calculate the SHA-256 of a file.
+        """
+        tracing.current_span().set_attribute("file", Path(file).name)
+        tracing.current_span().set_attribute("size", tracing.file_size(file))
+
+        signature = self._file_signature(file)
+        if signature in self._sha256_cache:
+            tracing.current_span().set_attribute("cache", "hit")
+            return self._sha256_cache[signature]
+
+        digest = hashlib.sha256()
+        with open(file, "rb") as data:
+            for chunk in iter(lambda: data.read(1024 * 1024), b""):
+                digest.update(chunk)
 
+        self._sha256_cache[signature] = digest.hexdigest()
+        return self._sha256_cache[signature]
 
+
+    @tracing.traced
+    def _check_signature(self, file: str) -> str:
+        """
+        Verify a package's signature, returning its Developer ID Installer team ID ("" if none).
+        """
+        result = tracing.run([BIN_PKGUTIL, "--check-signature", file], capture_output=True).stdout.decode("utf-8").strip()
+        for line in result.split("\n"):
+            if "Developer ID Installer: " not in line:
+                continue
+            return line.split("(")[1].split(")")[0]
+        return ""
+
+
+    @tracing.traced
     def _resolve_team_id(self, file: str) -> str:
         """
         Determine the team ID of a package.
@@ -350,14 +501,22 @@ class BaselineBuilder:
         logging.info(f"    Determining Team ID for: {Path(file).name}...")
         if file.startswith("/usr/local/Baseline/"):
             file = file.replace("/usr/local/Baseline", f"{self._build_directory_path}")
+        tracing.current_span().set_attribute("file", Path(file).name)
+        tracing.current_span().set_attribute("size", tracing.file_size(file))
 
-        if file.endswith(".pkg"):
-            result = subprocess.run([BIN_PKGUTIL, "--check-signature", file], capture_output=True).stdout.decode("utf-8").strip()
-            for line in result.split("\n"):
-                if "Developer ID Installer: " not in line:
-                    continue
-                return line.split("(")[1].split(")")[0]
-        return ""
+        if not file.endswith(".pkg"):
+            return ""
+
+        signature = self._file_signature(file) if Path(file).exists() else None
+        if signature in self._team_id_cache:
+            tracing.current_span().set_attribute("cache", "hit")
+            return self._team_id_cache[signature]
+
+        team_id = self._check_signature(file)
+
+        if signature is not None:
+            self._team_id_cache[signature] = team_id
+        return team_id
 
 
     def _resolve_arguments(self, arguments: str) -> list:
@@ -380,6 +539,7 @@ class BaselineBuilder:
         return arguments_string
 
 
+    @tracing.traced
     def _parse_baseline_configuration(self) -> None:
         """
         Parse the baseline configuration file and resolve any files.
@@ -462,20 +622,56 @@ class BaselineBuilder:
             self.configuration["Baseline-Builder"]["swiftDialog Version"] = self._swiftdialog_resolved_version or "N/A"
             self.configuration["Baseline-Builder"]["Installomator Version"] = self._installomator_resolved_version or "N/A"
 
+        if self._optimize_assets is True:
+            self._optimize_icons()
+
         # Write the configuration file.
         plistlib.dump(self.configuration, open(self._baseline_configuration, "wb"), sort_keys=False)
 
 
+    @tracing.traced
+    def _optimize_icons(self) -> None:
+        """
+        Losslessly shrink resolved icons, and point references to collapsed duplicates at the remaining copy.
+        """
+        if not self._build_icons_path.exists():
+            return
+
+        logging.info("Optimizing icons...")
+        duplicates, _ = AssetOptimizer(self._asset_cache).optimize_directory(self._build_icons_path)
+        if not duplicates:
+            return
+
+        # Icons are referenced directly (Icon) or within argument strings (Arguments, Dialog*Options).
+        production_path = str(self._build_icons_path).replace(str(self._build_directory_path), "/usr/local/Baseline")
+        patterns = {
+            re.compile(re.escape(f"{production_path}/{duplicate}") + r"(?=$|[\s\"'])"): f"{production_path}/{original}"
+            for duplicate, original in duplicates.items()
+        }
+
+        def _rewrite(value):
+            if isinstance(value, dict):
+                return {key: _rewrite(item) for key, item in value.items()}
+            if isinstance(value, list):
+                return [_rewrite(item) for item in value]
+            if isinstance(value, str):
+                for pattern, replacement in patterns.items():
+                    value = pattern.sub(replacement, value)
+            return value
+
+        self.configuration = _rewrite(self.configuration)
+
+
     def _set_file_permissions(self) -> None:
         """
         Set file permissions to ensure that when Baseline is installed, the files are executable.
         """
         if Path(self._baseline_core_script).exists():
-            subprocess.run([BIN_CHMOD, "+x", self._baseline_core_script])
+            tracing.run([BIN_CHMOD, "+x", self._baseline_core_script])
 
         if Path(self._build_scripts_path).exists():
             for file in self._build_scripts_path.iterdir():
-                subprocess.run([BIN_CHMOD, "+x", file])
+                tracing.run([BIN_CHMOD, "+x", file])
 
 
     def _clear_problematic_xattr(self) -> None:
@@ -488,7 +684,7 @@ class BaselineBuilder:
             "com.apple.metadata:kMDItemWhereFroms",
         ]
         for xattr in xattr_to_remove:
-            subprocess.run([BIN_XATTR, "-dr", xattr, self._build_directory_path])
+            tracing.run([BIN_XATTR, "-dr", xattr, self._build_directory_path])
 
 
     def _generate_fake_icon(self) -> None:
@@ -497,46 +693,82 @@ class BaselineBuilder:
         Thus create a fake Baseline app for it to pull the icon from.
         """
         app_path = self._build_directory_path / ".Baseline.app"
-        Path(app_path, "Contents/Resources").mkdir(parents=True)
-        result = subprocess.run([BIN_CP, "-c", self._simple_mdm_icon, app_path / "Contents/Resources/"])
+        Path(app_path, "Contents/Resources").mkdir(parents=True, exist_ok=True)
+        result = tracing.run([BIN_CP, "-c", self._simple_mdm_icon, app_path / "Contents/Resources/"])
         if result.returncode != 0:
             raise Exception(f"Unable to copy icon to fake app: {self._simple_mdm_icon}")
         plistlib.dump({"CFBundleIconFile": Path(self._simple_mdm_icon).name}, open(app_path / "Contents/Info.plist", "wb"), sort_keys=False)
 
 
-    def _generate_pkg(self) -> bool:
+    @tracing.traced
+    def _generate_pkg(self, output: str = None, configuration: str = None, as_distribution: bool = None) -> bool:
         """
         Generate package using macos_pkg_builder library.
+
+        Parameters:
+            output:          Path to write pkg to, defaults to self.output.
+            configuration:   Configuration to embed as BaselineConfig.plist, mobileconfigs are not embedded.
+                             Defaults to self._baseline_configuration.
+            as_distribution: Whether to wrap as distribution pkg, defaults to pkg_as_distribution.
         """
+        import macos_pkg_builder
+
+        if output is None:
+            output = self.output
+        if configuration is None:
+            configuration = self._baseline_configuration
+        if as_distribution is None:
+            as_distribution = self._pkg_as_distribution
+
+        tracing.current_span().set_attribute("output", str(output))
+        tracing.current_span().set_attribute("distribution", as_distribution)
+
+        file_structure = {
+            # Required
+            f"{self._baseline_launch_daemon}" : "/Library/LaunchDaemons/com.secondsonconsulting.baseline.plist",
+            f"{self._baseline_core_script}"   : "/usr/local/Baseline/Baseline.sh",
+
+            # Dependant on configuration file.
+            **({ f"{configuration}" : "/usr/local/Baseline/BaselineConfig.plist", } if str(configuration).endswith(".plist") else {}),
+
+            # Optional if user requested
+            **({ f"{self._build_pkg_path}"    : "/usr/local/Baseline/Packages" } if self._build_pkg_path.exists()     else {}),
+            **({ f"{self._build_scripts_path}": "/usr/local/Baseline/Scripts"  } if self._build_scripts_path.exists() else {}),
+            **({ f"{self._build_icons_path}"  : "/usr/local/Baseline/Icons"    } if self._build_icons_path.exists()   else {}),
+
+            # SimpleMDM icon (if requested)
+            **({ f"{self._build_directory_path}/.Baseline.app" : "/usr/local/Baseline/.Baseline.app" } if self._simple_mdm_icon is not None else {})
+        }
+
+        # Digest manifest of the above, for validate_pkg(fast=True).
+        # Written per pkg, as flavours may be generated in parallel with differing contents.
+        manifest_file = None
+        if self._embed_manifest is True:
+            with tempfile.NamedTemporaryFile(dir=self._build_directory_path, prefix="BaselineManifest-", suffix=".plist", delete=False) as manifest_file:
+                plistlib.dump(manifest.generate_manifest(file_structure, self._calculate_sha256), manifest_file, sort_keys=False)
+            file_structure[manifest_file.name] = f"/{manifest.MANIFEST_PATH}"
+
         pkg_obj = macos_pkg_builder.Packages(
-            pkg_output=self.output,
+            pkg_output=output,
             pkg_bundle_id=self.identifier,
             pkg_version=self.version,
             pkg_preinstall_script=self._baseline_preinstall_script,
             pkg_postinstall_script=self._baseline_postinstall_script,
-            pkg_file_structure={
-                # Required
-                f"{self._baseline_launch_daemon}" : "/Library/LaunchDaemons/com.secondsonconsulting.baseline.plist",
-                f"{self._baseline_core_script}"   : "/usr/local/Baseline/Baseline.sh",
-
-                # Dependant on configuration file.
-                **({ f"{self._baseline_configuration}" : "/usr/local/Baseline/BaselineConfig.plist", } if self.configuration_file.endswith(".plist") else {}),
-
-                # Optional if user requested
-                **({ f"{self._build_pkg_path}"    : "/usr/local/Baseline/Packages" } if self._build_pkg_path.exists()     else {}),
-                **({ f"{self._build_scripts_path}": "/usr/local/Baseline/Scripts"  } if self._build_scripts_path.exists() else {}),
-                **({ f"{self._build_icons_path}"  : "/usr/local/Baseline/Icons"    } if self._build_icons_path.exists()   else {}),
-
-                # SimpleMDM icon (if requested)
-                **({ f"{self._build_directory_path}/.Baseline.app" : "/usr/local/Baseline/.Baseline.app" } if self._simple_mdm_icon is not None else {})
-            },
+            pkg_file_structure=file_structure,
             **({ "pkg_signing_identity": self._signing_identity } if self._signing_identity != "" else {}),
-            **({ "pkg_as_distribution": self._pkg_as_distribution } if self._pkg_as_distribution is True else {})
+            **({ "pkg_as_distribution": as_distribution } if as_distribution is True else {})
         )
 
-        return pkg_obj.build()
+        try:
+            result = pkg_obj.build()
+        finally:
+            if manifest_file is not None:
+                Path(manifest_file.name).unlink()
+        tracing.current_span().set_attribute("size", tracing.file_size(output))
+        return result
 
 
+    @tracing.traced
     def _validate(self, configuration: str = None, directory: str = None, localize: bool = True) -> None:
         """
         Validate the configuration file.
@@ -549,7 +781,7 @@ class BaselineBuilder:
 
         config = plistlib.load(open(configuration, "rb"))
 
-        config_contents = config if self.configuration_file.endswith(".plist") else config["PayloadContent"][0]
+        config_contents = config if str(configuration).endswith(".plist") else config["PayloadContent"][0]
 
         logging.info("Validating configuration file...")
         for variant in ["InitialScripts", "Installomator", "Packages", "Scripts"]:
@@ -581,52 +813,108 @@ class BaselineBuilder:
         logging.info("Configuration file is valid.")
 
 
+    def _installomator_script_source(self) -> tuple:
+        """
+        Resolve where to fetch Installomator.sh from.
+        Returns raw URL and GraphQL object expression.
+        """
+        if self._installomator_version == "latest":
+            return f"{self._release_resolver.raw_url}/Installomator/Installomator/main/Installomator.sh", "main:Installomator.sh"
+        return f"{self._release_resolver.raw_url}/Installomator/Installomator/blob/{self._installomator_version}/Installomator.sh", f"{self._installomator_version}:Installomator.sh"
+
+
+    @tracing.traced
+    def _resolve_releases(self) -> None:
+        """
+        Resolve release metadata of all enabled components (and Installomator.sh if labels are used) in one round trip.
+        Results are shared through the download coordinator, individual requests are made for anything left unresolved.
+        """
+        releases = {}
+        if not self._baseline_version.startswith("branch: ") and not Path("Baseline.zip").exists():
+            releases[self._release_resolver.release_url("secondsonconsulting/Baseline", self._baseline_version)] = ("secondsonconsulting/Baseline", self._baseline_version)
+        if self._build_cache_swift_dialog is True and not Path("swiftDialog.pkg").exists():
+            releases[self._release_resolver.release_url("swiftDialog/swiftDialog", self._swiftdialog_version)] = ("swiftDialog/swiftDialog", self._swiftdialog_version)
+        if self._build_cache_installomator is True and not Path("Installomator.pkg").exists():
+            releases[self._release_resolver.release_url("Installomator/Installomator", self._installomator_version)] = ("Installomator/Installomator", self._installomator_version)
+
+        files = {}
+        config_contents = self.configuration if self.configuration_file.endswith(".plist") else self.configuration["PayloadContent"][0]
+        if any("Label" in item for item in config_contents.get("Installomator", [])):
+            url, expression = self._installomator_script_source()
+            files[url] = ("Installomator/Installomator", expression)
+
+        releases = {url: release for url, release in releases.items() if not self._download_coordinator.cached(("release", url))}
+        files    = {url: file    for url, file    in files.items()    if not self._download_coordinator.cached(("installomator-script", url))}
+        if not releases and not files:
+            return
+
+        logging.info("Resolving releases...")
+        try:
+            resolved = self._release_resolver.resolve(releases, files)
+        except Exception as error:
+            logging.info(f"  Unable to resolve releases in batch, falling back to individual requests: {error}")
+            return
+
+        for url, release in resolved["releases"].items():
+            self._download_coordinator.single_flight(("release", url), lambda release=release: release)
+        for url, text in resolved["files"].items():
+            self._download_coordinator.single_flight(("installomator-script", url), lambda text=text: text)
+
+
+    @tracing.traced
     def _is_installomator_label_valid(self, label: str) -> bool:
         """
         Verify whether Installomator label is valid.
         """
         logging.info(f"    Validating Installomator label: {label}...")
 
-        global INSTALLOMATOR_SUPPORTED_LABELS
-        if INSTALLOMATOR_SUPPORTED_LABELS == []:
-            if self._installomator_version == "latest":
-                url = "https://raw.githubusercontent.com/Installomator/Installomator/main/Installomator.sh"
-            else:
-                url = f"https://raw.githubusercontent.com/Installomator/Installomator/blob/{self._installomator_version}/Installomator.sh"
+        url, _ = self._installomator_script_source()
 
-            result = requests.get(url)
+        def _fetch_script() -> str:
+            result = self._fetch_api_content(url)
             if result.status_code != 200:
                 raise Exception(f"Unable to fetch Installomator.sh: {result.status_code}")
-            # Write to download cache.
-            with open(f"{DOWNLOAD_CACHE.name}/Installomator.sh", "w") as file:
-                file.write(result.text)
+            return result.text
+
+        def _fetch_labels() -> list:
+            # Usually resolved ahead of time alongside releases, see _resolve_releases().
+            script = self._download_coordinator.single_flight(("installomator-script", url), _fetch_script)
+
+            with tempfile.NamedTemporaryFile(dir=self._download_coordinator.directory, suffix="-Installomator.sh") as file:
+                file.write(script.encode("utf-8"))
+                file.flush()
+
+                # Replicate installomator's label validation.
+                # https://github.com/Installomator/Installomator/blob/v10.5/Installomator.sh#L1413-L1418
+                labels = tracing.run([BIN_GREP, "--extended-regexp", "^[a-z0-9\_-]*(\)|\|\\\\)$", file.name], capture_output=True).stdout.decode("utf-8").strip()
 
-            # Replicate installomator's label validation.
-            # https://github.com/Installomator/Installomator/blob/v10.5/Installomator.sh#L1413-L1418
-            labels = subprocess.run([BIN_GREP, "--extended-regexp", "^[a-z0-9\_-]*(\)|\|\\\\)$", f"{DOWNLOAD_CACHE.name}/Installomator.sh"], capture_output=True).stdout.decode("utf-8").strip()
             labels = labels.replace(")", "").replace("|", "").replace("\\", "").split("\n")
             labels = [label for label in labels if label not in ["longversion", "version"]]
             labels = [label for label in labels if label.startswith("broken.") is False]
+            return labels
 
-            INSTALLOMATOR_SUPPORTED_LABELS = labels
-
-        if label in INSTALLOMATOR_SUPPORTED_LABELS:
+        # Shared between builders, only fetched and parsed once per Installomator version.
+        if label in self._download_coordinator.single_flight(("installomator-labels", url), _fetch_labels):
             return True
 
         return False
 
 
-    def _validate_pkg(self, pkg: str) -> None:
+    @tracing.traced
+    def _validate_pkg(self, pkg: str, configuration: str = None) -> None:
         """
         Extract pkg contents, and validate if it would install correctly.
         """
 
-        logging
+        if configuration is None:
+            configuration = self.configuration_file
+
+        tracing.current_span().set_attribute("size", tracing.file_size(pkg))
 
         temp_directory = tempfile.TemporaryDirectory()
         source = Path(temp_directory.name + "/pkg")
 
-        subprocess.run([BIN_PKGUTIL, "--expand", pkg, source], capture_output=True)
+        tracing.run([BIN_PKGUTIL, "--expand", pkg, source], capture_output=True)
 
         payload_path = f"{temp_directory.name}/pkg/Payload"
 
@@ -641,20 +929,20 @@ class BaselineBuilder:
         if not Path(payload_path).exists():
             raise Exception(f"Unable to find Payload in pkg: {pkg}")
 
-        subprocess.run([BIN_TAR, "--extract", "--file", payload_path, "--directory", source], capture_output=True)
+        tracing.run([BIN_TAR, "--extract", "--file", payload_path, "--directory", source], capture_output=True)
 
         # Check core files.
         files = [
             "/Library/LaunchDaemons/com.secondsonconsulting.baseline.plist",
             "/usr/local/Baseline/Baseline.sh",
-            "/usr/local/Baseline/BaselineConfig.plist" if self.configuration_file.endswith(".plist") else "",
+            "/usr/local/Baseline/BaselineConfig.plist" if configuration.endswith(".plist") else "",
         ]
         for file in files:
             if file == "":
                 continue
             if not Path(f"{source}{file}").exists():
                 logging.info(f"Unable to find file in pkg: {source}{file}")
-                subprocess.run(["open", source])
+                tracing.run(["open", source])
                 input("Press Enter to continue...")
                 raise Exception(f"Unable to find file in pkg: {source}{file}")
 
@@ -663,31 +951,86 @@ class BaselineBuilder:
                 plistlib.load(open(f"{source}{file}", "rb"))
 
         # Load embedded config or exported mobileconfig.
-        config = f"{source}/usr/local/Baseline/BaselineConfig.plist" if self.configuration_file.endswith(".plist") else self.configuration_file
+        config = f"{source}/usr/local/Baseline/BaselineConfig.plist" if configuration.endswith(".plist") else configuration
 
         self._validate(configuration=config, directory=source, localize=False)
 
 
-    def build(self) -> None:
+    def _convert_configuration(self, flavour: str) -> dict:
         """
-        Build Baseline
-
-        Raises:
-            Exception: Unable to generate pkg.
+        Convert the resolved configuration to the layout expected by the flavour.
+        """
+        is_plist = self.configuration_file.endswith(".plist")
+
+        if flavour in [FLAVOUR_PLIST, FLAVOUR_PLIST_DISTRIBUTION]:
+            if is_plist:
+                return self.configuration
+            config = {key: value for key, value in self.configuration["PayloadContent"][0].items() if not key.startswith("Payload")}
+            if "Baseline-Builder" in self.configuration:
+                config["Baseline-Builder"] = self.configuration["Baseline-Builder"]
+            return config
+
+        if not is_plist:
+            return self.configuration
+
+        # Generate UUIDs from the identifier, so rebuilds replace rather than duplicate installed profiles.
+        payload_identifier = f"{self.identifier}.baseline"
+        config = {
+            "PayloadContent": [
+                {
+                    **{key: value for key, value in self.configuration.items() if key != "Baseline-Builder"},
+                    "PayloadDisplayName": "Baseline",
+                    "PayloadIdentifier":  payload_identifier,
+                    "PayloadType":        BASELINE_PAYLOAD_TYPE,
+                    "PayloadUUID":        str(uuid.uuid5(uuid.NAMESPACE_DNS, payload_identifier)).upper(),
+                    "PayloadVersion":     1,
+                }
+            ],
+            "PayloadDisplayName": "Baseline",
+            "PayloadIdentifier":  self.identifier,
+            "PayloadScope":       "System",
+            "PayloadType":        "Configuration",
+            "PayloadUUID":        str(uuid.uuid5(uuid.NAMESPACE_DNS, self.identifier)).upper(),
+            "PayloadVersion":     1,
+        }
+        if "Baseline-Builder" in self.configuration:
+            config["Baseline-Builder"] = self.configuration["Baseline-Builder"]
+        return config
+
+
+    @tracing.traced
+    def _stage(self) -> None:
+        """
+        Fetch, resolve and validate all assets into the build directory.
         """
         self.configuration = plistlib.load(open(self.configuration_file, "rb"))
 
-        self._fetch_baseline(version=self._baseline_version)
-        if self._build_cache_swift_dialog is True:
-            self._fetch_swift_dialog(version=self._swiftdialog_version)
-        if self._build_cache_installomator is True:
-            self._fetch_installomator(version=self._installomator_version)
+        if self._components_fetched is False:
+            self._resolve_releases()
+            self._fetch_baseline(version=self._baseline_version)
+            if self._build_cache_swift_dialog is True:
+                self._fetch_swift_dialog(version=self._swiftdialog_version)
+            if self._build_cache_installomator is True:
+                self._fetch_installomator(version=self._installomator_version)
+            self._components_fetched = True
+
         self._parse_baseline_configuration()
         self._set_file_permissions()
         self._clear_problematic_xattr()
         self._validate()
         if self._simple_mdm_icon is not None:
             self._generate_fake_icon()
+
+
+    @tracing.traced
+    def build(self) -> None:
+        """
+        Build Baseline
+
+        Raises:
+            Exception: Unable to generate pkg.
+        """
+        self._stage()
         if self._generate_pkg() is False:
             raise Exception("Failed to generate pkg.")
 
@@ -697,10 +1040,168 @@ class BaselineBuilder:
             logging.info(f"Configuration file set to: {self.configuration_file}")
 
 
-    def validate_pkg(self, pkg: str = None) -> None:
+    @tracing.traced
+    def build_flavours(self, flavours: list = None) -> dict:
+        """
+        Build multiple output flavours from a single staged build.
+
+        Assets are fetched, resolved and validated once, then each flavour's pkg is generated in parallel.
+        Outputs are written next to 'output', with the flavour appended to the name:
+            ex. 'Baseline.pkg' -> 'Baseline (plist).pkg', 'Baseline (mobileconfig).pkg'
+
+        Mobileconfig flavours additionally write a '-resolved.mobileconfig' next to the pkg.
+
+        Parameters:
+            flavours: List of flavours to build, see SUPPORTED_FLAVOURS.
+                      Defaults to plist and mobileconfig.
+
+        Returns:
+            Dictionary of flavour to (pkg, configuration) paths, usable with validate_pkg().
+
+        Raises:
+            Exception: Unknown flavour.
+            Exception: Unable to generate pkg.
+        """
+        if flavours is None:
+            flavours = [FLAVOUR_PLIST, FLAVOUR_MOBILECONFIG]
+
+        for flavour in flavours:
+            if flavour not in SUPPORTED_FLAVOURS:
+                raise Exception(f"Unknown flavour: {flavour}")
+
+        self._stage()
+
+        plist_configuration        = self._build_directory_path / "Baseline" / "BaselineConfig.plist"
+        mobileconfig_configuration = Path(self.output).parent / Path(Path(self.configuration_file).stem + "-resolved.mobileconfig")
+
+        # Staging already wrote the configuration in the input's layout.
+        written = [self._baseline_configuration]
+
+        outputs = {}
+        for flavour in flavours:
+            is_plist      = flavour in [FLAVOUR_PLIST, FLAVOUR_PLIST_DISTRIBUTION]
+            configuration = plist_configuration if is_plist else mobileconfig_configuration
+
+            if configuration not in written:
+                plistlib.dump(self._convert_configuration(flavour), open(configuration, "wb"), sort_keys=False)
+                written.append(configuration)
+
+            outputs[flavour] = (
+                str(Path(self.output).with_name(f"{Path(self.output).stem} ({flavour}){Path(self.output).suffix}")),
+                str(configuration),
+            )
+
+        # Pool threads start with an empty span stack, parent their spans to this build explicitly.
+        parent = tracing.current_span()
+
+        def _generate(flavour: str, output: str, configuration: str) -> bool:
+            with tracing.span("flavour", parent=parent, flavour=flavour):
+                return self._generate_pkg(
+                    output=output,
+                    configuration=configuration,
+                    as_distribution=flavour in [FLAVOUR_PLIST_DISTRIBUTION, FLAVOUR_MOBILECONFIG_DISTRIBUTION],
+                )
+
+        logging.info(f"Generating pkg flavours: {', '.join(flavours)}...")
+        with ThreadPoolExecutor(max_workers=len(flavours) or 1) as executor:
+            results = {
+                flavour: executor.submit(_generate, flavour, output, configuration)
+                for flavour, (output, configuration) in outputs.items()
+            }
+
+        failed = [flavour for flavour, result in results.items() if result.result() is False]
+        if failed:
+            raise Exception(f"Failed to generate pkg for flavours: {', '.join(failed)}")
+
+        return outputs
+
+
+    @tracing.traced
+    def _rebuild(self, changed: list) -> None:
+        """
+        Rebuild pkg after files changed, reusing staged assets and hashes of everything else.
+        """
+        configuration_file = str(Path(self.configuration_file).absolute())
+
+        # Configuration changes may drop references, so restage every resolved file.
+        # Unchanged files keep their stat signature when copied, thus hashes are still reused.
+        stale = list(self._resolved_files) if configuration_file in changed else changed
+        for file in stale:
+            if file in self._resolved_files and self._resolved_files[file].exists():
+                self._resolved_files[file].unlink()
+        self._resolved_files = {}
+
+        self.configuration = plistlib.load(open(self.configuration_file, "rb"))
+        self._parse_baseline_configuration()
+        self._set_file_permissions()
+        self._clear_problematic_xattr()
+        self._validate()
+        if self._simple_mdm_icon is not None:
+            if str(Path(self._simple_mdm_icon).absolute()) in changed or not (self._build_directory_path / ".Baseline.app").exists():
+                self._generate_fake_icon()
+        if self._generate_pkg() is False:
+            raise Exception("Failed to generate pkg.")
+
+
+    def watch(self, interval: float = 0.5) -> None:
+        """
+        Build Baseline, then rebuild whenever the configuration file or any file it references changes.
+        Each successful build is validated against its embedded manifest.
+        Failed builds are reported and retried on the next change, runs until interrupted.
+
+        Parameters:
+            interval: Seconds between checks when kqueue is unavailable.
+        """
+        def _build(changed: list) -> None:
+            start = time.perf_counter()
+            try:
+                # Until staging first succeeds (ex. configuration was mid-edit), there's nothing to rebuild incrementally.
+                if self._components_fetched is False:
+                    self._stage()
+                    if self._generate_pkg() is False:
+                        raise Exception("Failed to generate pkg.")
+                else:
+                    self._rebuild(changed)
+                # Unlike build(), configuration_file stays the source, validate against the resolved variant.
+                self.validate_pkg(configuration=str(self._baseline_configuration), fast=self._embed_manifest)
+            except Exception as error:
+                logging.info(f"Build failed: {error}")
+            else:
+                logging.info(f"Built {self.output} in {time.perf_counter() - start:.2f}s")
+
+        _build([])
+
+        def _watched_files() -> list:
+            return [
+                self.configuration_file,
+                *self._resolved_files,
+                *([self._simple_mdm_icon] if self._simple_mdm_icon is not None else []),
+            ]
+
+        watcher = FileWatcher(_watched_files(), interval=interval)
+        logging.info(f"Watching {len(_watched_files())} files for changes, press Ctrl+C to stop...")
+
+        while True:
+            changed = watcher.wait()
+            logging.info(f"Changed: {', '.join(Path(file).name for file in changed)}")
+
+            _build(changed)
+            watcher.update(_watched_files())
+
+
+    @tracing.traced
+    def validate_pkg(self, pkg: str = None, configuration: str = None, fast: bool = False, digests: str = manifest.DIGESTS_SAMPLE) -> None:
         """
         Validate Baseline pkg (post-build)
 
+        Parameters:
+            pkg:           Path to pkg, defaults to output.
+            configuration: Configuration the pkg was built with, defaults to configuration_file.
+                           '.plist' validates against the embedded BaselineConfig.plist.
+            fast:          Verify the Payload against the embedded manifest instead of extracting and re-validating.
+                           Requires pkg built with embed_manifest.
+            digests:       With fast, whether file contents are hashed: 'none', 'sample' (spot-check) or 'all'.
+
         Raises:
             Exception: Unable to find pkg.
             Exception: Unable to validate pkg.
@@ -714,5 +1215,9 @@ class BaselineBuilder:
             logging.info("Please build the pkg first.")
             raise Exception("Unable to find pkg.")
 
-        self._validate_pkg(pkg)
-        logging.info("Post-build validation complete.")
\ No newline at end of file
+        if fast is True:
+            result = manifest.verify_manifest(pkg, digests=digests)
+            logging.info(f"Payload matches manifest: {len(result['Files'])} files, root hash {result['RootHash']}")
+        else:
+            self._validate_pkg(pkg, configuration=configuration)
+        logging.info("Post-build validation complete.")
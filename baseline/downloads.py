@@ -0,0 +1,205 @@
+"""
+downloads.py: Thread-safe download coordination for Baseline Builder.
+
+Allows multiple BaselineBuilder instances to run in parallel within one process:
+- Identical in-flight requests are performed once, with all callers receiving the result (single-flight).
+- Downloads are cached per URL, never by fixed file name, so builders can't overwrite each other.
+- Total concurrent transfers and bandwidth are capped.
+- Per-build workspaces are handed out on the same volume as the cache, keeping 'cp -c' clones cheap.
+- Downloads are hashed while being written (MD5, SHA-256 and size), so fetched assets never
+  need to be read back for their digests. The leading bytes are checked for a xar header,
+  identifying flat pkgs without reopening them.
+"""
+
+import hashlib
+import tempfile
+import threading
+import subprocess
+
+from pathlib import Path
+from concurrent.futures import Future
+
+from . import tracing, xar
+
+
+BIN_CURL: str = "/usr/bin/curl"
+
+READ_SIZE: int = 1024 * 1024
+
+
+class FetchedAsset:
+    """
+    Downloaded file, along with metadata gathered while it was written.
+    """
+
+    def __init__(self, path: Path, size: int, md5: str, sha256: str, is_flat_pkg: bool) -> None:
+        """
+        Parameters:
+            path:        Path to the cached file.
+            size:        Size in bytes.
+            md5:         MD5 hex digest.
+            sha256:      SHA-256 hex digest.
+            is_flat_pkg: Whether the file starts with a xar header, i.e. is a flat pkg whose signature can be checked.
+        """
+        self.path        = path
+        self.size        = size
+        self.md5         = md5
+        self.sha256      = sha256
+        self.is_flat_pkg = is_flat_pkg
+
+
+class DownloadCoordinator:
+
+    def __init__(self, directory: str = None, max_transfers: int = 4, max_bandwidth: int = 0) -> None:
+        """
+        Parameters:
+            directory:     Cache directory, defaults to a new temporary directory.
+            max_transfers: Maximum number of concurrent downloads.
+            max_bandwidth: Maximum total download rate in bytes per second, 0 for unlimited.
+
+        Raises:
+            Exception: max_transfers below 1, or max_bandwidth negative.
+        """
+        if max_transfers < 1:
+            raise Exception(f"max_transfers must be at least 1: {max_transfers}")
+        if max_bandwidth < 0:
+            raise Exception(f"max_bandwidth must not be negative: {max_bandwidth}")
+
+        if directory is None:
+            self._directory_obj = tempfile.TemporaryDirectory()
+            directory = self._directory_obj.name
+
+        self.directory     = Path(directory)
+        self.max_transfers = max_transfers
+        self.max_bandwidth = max_bandwidth
+
+        self._lock      = threading.Lock()
+        self._transfers = threading.BoundedSemaphore(max_transfers)
+        self._in_flight = {}
+        self._results   = {}
+
+
+    def single_flight(self, key, func):
+        """
+        Invoke func once per key, concurrent callers for the same key wait on the first.
+        Successful results are kept for the lifetime of the coordinator, failures are not.
+        """
+        with self._lock:
+            if key in self._results:
+                return self._results[key]
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not leader:
+            tracing.current_span().set_attribute("single_flight", "follower")
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as error:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(error)
+            raise
+
+        with self._lock:
+            self._results[key] = result
+            del self._in_flight[key]
+        future.set_result(result)
+
+        return result
+
+
+    def cached(self, key) -> bool:
+        """
+        Whether a successful result is already available for key.
+        """
+        with self._lock:
+            return key in self._results
+
+
+    def fetch(self, url: str, name: str) -> FetchedAsset:
+        """
+        Download url into the cache, returning the cached file and its metadata.
+        Concurrent and repeated requests for the same url share a single download.
+        """
+        return self.single_flight(("fetch", url), lambda: self._download(url, name))
+
+
+    def workspace(self) -> tempfile.TemporaryDirectory:
+        """
+        Isolated working directory for a single build, removed once the returned object is cleaned up.
+        """
+        workspaces = self.directory / "Workspaces"
+        workspaces.mkdir(parents=True, exist_ok=True)
+        return tempfile.TemporaryDirectory(dir=workspaces)
+
+
+    def _tee(self, command: list, output) -> FetchedAsset:
+        """
+        Stream curl's output into file, computing digests and checking for a xar header in the same pass.
+        """
+        md5    = hashlib.md5()
+        sha256 = hashlib.sha256()
+        size   = 0
+        header = b""
+
+        with tracing.span(f"subprocess: {Path(command[0]).name}", command=" ".join(command)) as span:
+            # With '-s', stderr only carries the error line from '--show-error'.
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            try:
+                for chunk in iter(lambda: process.stdout.read(READ_SIZE), b""):
+                    output.write(chunk)
+                    md5.update(chunk)
+                    sha256.update(chunk)
+                    size += len(chunk)
+
+                    if len(header) < xar.XAR_HEADER_SIZE:
+                        header += chunk[:xar.XAR_HEADER_SIZE - len(header)]
+            except BaseException:
+                # Ex. failed write, don't leave curl running.
+                process.kill()
+                raise
+            finally:
+                process.stdout.close()
+                error = process.stderr.read().decode("utf-8", errors="replace").strip()
+                process.stderr.close()
+                span.set_attribute("returncode", process.wait())
+
+        if process.returncode != 0:
+            raise Exception(f"curl exited with {process.returncode}: {error}")
+
+        return FetchedAsset(None, size, md5.hexdigest(), sha256.hexdigest(), xar.archive_header_length(header) != 0)
+
+
+    @tracing.traced
+    def _download(self, url: str, name: str) -> FetchedAsset:
+        """
+        Download to a unique temporary file, then move into place once complete.
+        """
+        entry = self.directory / hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+        entry.mkdir(parents=True, exist_ok=True)
+        destination = entry / name
+
+        # Fail on HTTP errors, rather than caching an error page as the asset.
+        arguments = [BIN_CURL, "-s", "-L", "--fail", "--show-error"]
+        if self.max_bandwidth > 0:
+            # Split evenly between transfer slots, so the total never exceeds the cap.
+            arguments += ["--limit-rate", str(max(self.max_bandwidth // self.max_transfers, 1))]
+
+        with self._transfers:
+            with tempfile.NamedTemporaryFile(dir=entry, prefix=f".{name}.", delete=False) as partial:
+                try:
+                    asset = self._tee([*arguments, url], partial)
+                except Exception as error:
+                    Path(partial.name).unlink()
+                    raise Exception(f"Unable to download {url}: {error}")
+
+        Path(partial.name).replace(destination)
+        asset.path = destination
+        tracing.current_span().set_attribute("size", asset.size)
+
+        return asset
@@ -0,0 +1,307 @@
+"""
+manifest.py: Embedded digest manifest for Baseline Builder packages.
+
+At build time, every payload file's path, size and SHA-256 is recorded in
+BaselineManifest.plist alongside a root hash over all entries.
+
+At validation time, the pkg is read directly (xar TOC, then the Payload's
+cpio headers streamed from the archive), avoiding 'pkgutil --expand' and
+extraction to disk. Depending on the requested level, file contents are
+not hashed, spot-checked or fully hashed while streaming.
+"""
+
+import os
+import zlib
+import lzma
+import struct
+import random
+import hashlib
+import plistlib
+import itertools
+
+from pathlib import Path
+
+from . import tracing, xar
+
+
+MANIFEST_PATH:    str = "usr/local/Baseline/BaselineManifest.plist"
+MANIFEST_VERSION: int = 1
+
+# Digest verification levels.
+DIGESTS_NONE:   str = "none"
+DIGESTS_SAMPLE: str = "sample"
+DIGESTS_ALL:    str = "all"
+
+# When spot-checking, fraction of files hashed. Small files are always hashed.
+SAMPLE_RATE:     float = 0.1
+SAMPLE_MIN_SIZE: int   = 64 * 1024
+
+READ_SIZE: int = 1024 * 1024
+
+
+def root_hash(files: list) -> str:
+    """
+    Hash over all manifest entries, in path order.
+    """
+    digest = hashlib.sha256()
+    for entry in sorted(files, key=lambda entry: entry["Path"]):
+        digest.update(f"{entry['Path']}\0{entry['Size']}\0{entry['SHA256']}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def generate_manifest(file_structure: dict, sha256) -> dict:
+    """
+    Generate manifest for a macos_pkg_builder file structure (source path to install path).
+
+    Parameters:
+        file_structure: Dictionary of source file or directory to install path.
+        sha256:         Callable returning SHA-256 hex digest of a file.
+    """
+    files = []
+    for source, destination in file_structure.items():
+        destination = destination.lstrip("/")
+        if Path(source).is_file():
+            files.append({"Path": destination, "Size": Path(source).stat().st_size, "SHA256": sha256(source)})
+            continue
+        for root, _, names in os.walk(source):
+            for name in names:
+                file = Path(root, name)
+                if file.is_symlink() or not file.is_file():
+                    continue
+                files.append({"Path": f"{destination}/{file.relative_to(source)}", "Size": file.stat().st_size, "SHA256": sha256(str(file))})
+
+    files = sorted(files, key=lambda entry: entry["Path"])
+
+    return {
+        "Version":   MANIFEST_VERSION,
+        "Algorithm": "SHA-256",
+        "RootHash":  root_hash(files),
+        "Files":     files,
+    }
+
+
+class _Reader:
+    """
+    Exact-length reads over an iterator of byte chunks.
+    """
+
+    def __init__(self, chunks) -> None:
+        self._chunks = iter(chunks)
+        self._buffer = bytearray()
+
+
+    def read(self, length: int) -> bytes:
+        while len(self._buffer) < length:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        result = bytes(self._buffer[:length])
+        del self._buffer[:length]
+        return result
+
+
+    def stream(self, length: int):
+        """
+        Yield the next length bytes in chunks, without buffering them all.
+        """
+        while length > 0:
+            chunk = self.read(min(length, READ_SIZE))
+            if chunk == b"":
+                raise Exception("Unexpected end of Payload")
+            length -= len(chunk)
+            yield chunk
+
+
+def _read_range(file, offset: int, length: int):
+    file.seek(offset)
+    while length > 0:
+        chunk = file.read(min(length, READ_SIZE))
+        if chunk == b"":
+            break
+        length -= len(chunk)
+        yield chunk
+
+
+def _inflate(chunks, wbits: int):
+    """
+    Decompress zlib/gzip stream.
+    """
+    decompressor = zlib.decompressobj(wbits)
+    for chunk in chunks:
+        yield decompressor.decompress(chunk)
+        if decompressor.eof:
+            return
+
+
+def _unpbzx(chunks):
+    """
+    Decompress pbzx stream (chunked xz), used by some Apple payloads.
+    """
+    reader = _Reader(chunks)
+    reader.read(12)
+    while True:
+        header = reader.read(16)
+        if len(header) < 16:
+            return
+        _, length = struct.unpack(">QQ", header)
+        data = reader.read(length)
+        yield lzma.decompress(data) if data.startswith(b"\xfd7zXZ\x00") else data
+
+
+def _find_payload(pkg: str) -> tuple:
+    """
+    Locate Payload within the pkg's xar archive.
+    Returns offset, length and encoding of the Payload in the heap.
+    """
+    with open(pkg, "rb") as file:
+        header = file.read(xar.XAR_HEADER_SIZE)
+        heap   = xar.archive_header_length(header)
+        if heap == 0:
+            raise Exception(f"Not a flat pkg (xar) archive: {pkg}")
+        toc = xar.parse_toc(header + file.read(heap - len(header)))
+
+    def _search(element, parent: str):
+        for item in element.findall("file"):
+            path = f"{parent}{item.findtext('name')}"
+            if path == "Payload" or (path.endswith(".pkg/Payload") and path.count("/") == 1):
+                data = item.find("data")
+                encoding = data.find("encoding").get("style", "") if data.find("encoding") is not None else ""
+                return heap + int(data.findtext("offset")), int(data.findtext("length")), encoding
+            result = _search(item, f"{path}/")
+            if result is not None:
+                return result
+        return None
+
+    result = _search(toc.find("toc"), "")
+    if result is None:
+        raise Exception(f"Unable to find Payload in pkg: {pkg}")
+    return result
+
+
+def _iterate_payload(pkg: str, should_hash):
+    """
+    Stream cpio entries from the Payload.
+    Yields path, size, SHA-256 (None unless should_hash(path, size)) and contents (manifest only) of regular files.
+    """
+    offset, length, encoding = _find_payload(pkg)
+
+    with open(pkg, "rb") as file:
+        chunks = _read_range(file, offset, length)
+        if "gzip" in encoding:
+            chunks = _inflate(chunks, zlib.MAX_WBITS)
+
+        # Payload itself is usually gzip or pbzx compressed cpio.
+        reader = _Reader(chunks)
+        magic  = reader.read(4)
+        source = itertools.chain([magic], iter(lambda: reader.read(READ_SIZE), b""))
+        if magic[:2] == b"\x1f\x8b":
+            source = _inflate(source, zlib.MAX_WBITS | 32)
+        elif magic == b"pbzx":
+            source = _unpbzx(source)
+
+        cpio = _Reader(source)
+        while True:
+            magic = cpio.read(6)
+            if magic == b"070707":
+                header   = cpio.read(70)
+                mode     = int(header[12:18], 8)
+                namesize = int(header[53:59], 8)
+                filesize = int(header[59:70], 8)
+                name     = cpio.read(namesize)
+                padding  = 0
+            elif magic in [b"070701", b"070702"]:
+                header   = cpio.read(104)
+                mode     = int(header[8:16], 16)
+                filesize = int(header[48:56], 16)
+                namesize = int(header[88:96], 16)
+                name     = cpio.read(namesize)
+                cpio.read((4 - (110 + namesize) % 4) % 4)
+                padding  = (4 - filesize % 4) % 4
+            else:
+                raise Exception(f"Unsupported Payload format: {pkg}")
+
+            path = name.rstrip(b"\0").decode("utf-8")
+            if path == "TRAILER!!!":
+                return
+            path = path[2:] if path.startswith("./") else path.lstrip("/")
+
+            # Only regular files carry contents worth verifying.
+            is_file = mode & 0o170000 == 0o100000
+            digest  = hashlib.sha256() if is_file and should_hash(path, filesize) else None
+
+            data = b""
+            for chunk in cpio.stream(filesize):
+                if digest is not None:
+                    digest.update(chunk)
+                if path == MANIFEST_PATH:
+                    data += chunk
+            cpio.read(padding)
+
+            if not is_file:
+                continue
+
+            yield path, filesize, digest.hexdigest() if digest is not None else None, data
+
+
+@tracing.traced
+def verify_manifest(pkg: str, digests: str = DIGESTS_SAMPLE) -> dict:
+    """
+    Verify pkg Payload against its embedded manifest.
+
+    Parameters:
+        pkg:     Path to pkg.
+        digests: DIGESTS_NONE (headers only), DIGESTS_SAMPLE (spot-check) or DIGESTS_ALL.
+
+    Returns:
+        Manifest embedded in the pkg.
+
+    Raises:
+        Exception: Missing or malformed manifest.
+        Exception: Payload doesn't match manifest.
+    """
+    if digests not in [DIGESTS_NONE, DIGESTS_SAMPLE, DIGESTS_ALL]:
+        raise Exception(f"Unknown digest verification level: {digests}")
+
+    def _should_hash(path: str, size: int) -> bool:
+        if digests == DIGESTS_ALL:
+            return True
+        if digests == DIGESTS_SAMPLE:
+            return size <= SAMPLE_MIN_SIZE or random.random() < SAMPLE_RATE
+        return False
+
+    manifest = None
+    payload  = {}
+    for path, size, digest, data in _iterate_payload(pkg, _should_hash):
+        if path == MANIFEST_PATH:
+            manifest = plistlib.loads(data)
+            continue
+        payload[path] = (size, digest)
+
+    if manifest is None:
+        raise Exception(f"No manifest embedded in pkg: {pkg}")
+    if manifest.get("Version") != MANIFEST_VERSION:
+        raise Exception(f"Unsupported manifest version: {manifest.get('Version')}")
+    if root_hash(manifest["Files"]) != manifest["RootHash"]:
+        raise Exception("Manifest root hash mismatch, manifest is inconsistent or corrupt")
+
+    unlisted = set(payload) - {entry["Path"] for entry in manifest["Files"]}
+    if unlisted:
+        raise Exception(f"Files in Payload missing from manifest: {', '.join(sorted(unlisted))}")
+
+    hashed = 0
+    for entry in manifest["Files"]:
+        if entry["Path"] not in payload:
+            raise Exception(f"Missing file in Payload: {entry['Path']}")
+        size, digest = payload[entry["Path"]]
+        if size != entry["Size"]:
+            raise Exception(f"Size mismatch for {entry['Path']}: expected {entry['Size']}, found {size}")
+        if digest is not None:
+            hashed += 1
+            if digest != entry["SHA256"]:
+                raise Exception(f"SHA-256 mismatch for {entry['Path']}")
+
+    tracing.current_span().set_attribute("files", len(manifest["Files"]))
+    tracing.current_span().set_attribute("hashed", hashed)
+
+    return manifest
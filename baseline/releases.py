@@ -0,0 +1,147 @@
+"""
+releases.py: Batched GitHub release resolution for Baseline Builder.
+
+Resolves release metadata of every component (and optionally repository files,
+such as Installomator.sh) in a single round trip:
+- With a GitHub token: One GraphQL query, with each request aliased.
+- Without: Parallel REST requests over a shared connection pool, as GraphQL requires authentication.
+
+Results are normalized to the REST API's release layout ('tag_name', 'zipball_url', 'assets').
+Point 'api_url' and 'raw_url' at a local server to stub GitHub out.
+"""
+
+import json
+
+from concurrent.futures import ThreadPoolExecutor
+
+from . import tracing
+
+
+GITHUB_API_URL: str = "https://api.github.com"
+GITHUB_RAW_URL: str = "https://raw.githubusercontent.com"
+
+
+class ReleaseResolver:
+
+    def __init__(self, token: str = "", api_url: str = GITHUB_API_URL, raw_url: str = GITHUB_RAW_URL) -> None:
+        """
+        Parameters:
+            token:   GitHub token, enables GraphQL batching.
+            api_url: Base URL of GitHub's API.
+            raw_url: Base URL of raw repository content.
+        """
+        self.token   = token
+        self.api_url = api_url
+        self.raw_url = raw_url
+
+
+    def release_url(self, repository: str, version: str) -> str:
+        """
+        REST URL of a release, 'latest' or tag name.
+        """
+        if version == "latest":
+            return f"{self.api_url}/repos/{repository}/releases/latest"
+        return f"{self.api_url}/repos/{repository}/releases/tags/{version}"
+
+
+    def _headers(self) -> dict:
+        if self.token == "":
+            return {}
+        return {"Authorization": f"token {self.token}"}
+
+
+    @tracing.traced
+    def resolve(self, releases: dict, files: dict = None) -> dict:
+        """
+        Resolve releases and files in one round trip.
+
+        Parameters:
+            releases: Dictionary of release URL (see release_url()) to (repository, version).
+            files:    Dictionary of raw file URL to (repository, expression), expression as 'ref:path'.
+
+        Returns:
+            Dictionary with 'releases' (release URL to release) and 'files' (raw file URL to text).
+            Requests which failed are omitted.
+        """
+        files = files or {}
+
+        tracing.current_span().set_attribute("releases", len(releases))
+        tracing.current_span().set_attribute("files", len(files))
+        tracing.current_span().set_attribute("graphql", self.token != "")
+
+        if self.token != "":
+            return self._resolve_graphql(releases, files)
+        return self._resolve_rest(releases, files)
+
+
+    def _resolve_graphql(self, releases: dict, files: dict) -> dict:
+        """
+        Resolve everything through a single GraphQL query.
+        """
+        import requests
+
+        def _repository(repository: str) -> str:
+            owner, name = repository.split("/")
+            return f"repository(owner: {json.dumps(owner)}, name: {json.dumps(name)})"
+
+        release_fields = "tagName releaseAssets(first: 20) { nodes { name downloadUrl } }"
+
+        queries = []
+        for index, (repository, version) in enumerate(releases.values()):
+            release = "latestRelease" if version == "latest" else f"release(tagName: {json.dumps(version)})"
+            queries.append(f"r{index}: {_repository(repository)} {{ release: {release} {{ {release_fields} }} }}")
+        for index, (repository, expression) in enumerate(files.values()):
+            queries.append(f"f{index}: {_repository(repository)} {{ object(expression: {json.dumps(expression)}) {{ ... on Blob {{ text isTruncated }} }} }}")
+
+        result = requests.post(f"{self.api_url}/graphql", json={"query": "query {\n" + "\n".join(queries) + "\n}"}, headers=self._headers())
+        if result.status_code != 200:
+            raise Exception(f"Unable to query GitHub GraphQL API: {result.status_code}")
+        data = result.json().get("data") or {}
+
+        resolved = {"releases": {}, "files": {}}
+        for index, (url, (repository, version)) in enumerate(releases.items()):
+            release = (data.get(f"r{index}") or {}).get("release")
+            if release is None:
+                continue
+            resolved["releases"][url] = {
+                "tag_name":    release["tagName"],
+                "zipball_url": f"{self.api_url}/repos/{repository}/zipball/{release['tagName']}",
+                "assets":      [{"name": asset["name"], "browser_download_url": asset["downloadUrl"]} for asset in release["releaseAssets"]["nodes"]],
+            }
+        for index, url in enumerate(files):
+            blob = (data.get(f"f{index}") or {}).get("object")
+            if blob is None or blob.get("text") is None or blob.get("isTruncated") is True:
+                continue
+            resolved["files"][url] = blob["text"]
+
+        return resolved
+
+
+    def _resolve_rest(self, releases: dict, files: dict) -> dict:
+        """
+        Resolve everything through parallel REST requests, sharing one connection pool.
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        pool    = HTTPAdapter(pool_maxsize=max(len(releases) + len(files), 1))
+        session.mount("https://", pool)
+        session.mount("http://",  pool)
+
+        def _fetch(url: str) -> "requests.Response":
+            headers = self._headers() if url.startswith(self.api_url) else {}
+            with tracing.span("_fetch_api_content", url=url) as span:
+                result = session.get(url, headers=headers)
+                span.set_attribute("status_code", result.status_code)
+                return result
+
+        urls = [*releases, *files]
+        with ThreadPoolExecutor(max_workers=max(len(urls), 1)) as executor:
+            results = dict(zip(urls, executor.map(_fetch, urls)))
+        session.close()
+
+        return {
+            "releases": {url: results[url].json() for url in releases if results[url].status_code == 200},
+            "files":    {url: results[url].text   for url in files    if results[url].status_code == 200},
+        }
@@ -0,0 +1,258 @@
+"""
+tracing.py: Lightweight span tracing for Baseline Builder.
+
+Records nested spans (with attributes such as file size, cache hit or component)
+and exports them to a local file on exit or when stop() is called:
+- '.jsonl': One span per line.
+- Otherwise: Chrome trace-event JSON, loadable in chrome://tracing, Perfetto or speedscope.
+
+When tracing is not started, span() and traced() reduce to a single None check.
+
+Usage:
+
+    >>> from baseline import tracing
+
+    >>> tracing.start("baseline-trace.json")
+
+    >>> with tracing.span("fetch", component="Baseline") as span:
+    >>>     span.set_attribute("cache", "hit")
+
+    >>> tracing.stop()
+"""
+
+import os
+import json
+import time
+import atexit
+import itertools
+import functools
+import threading
+import subprocess
+
+from pathlib import Path
+
+
+class Span:
+    """
+    Single timed operation, use as a context manager.
+    """
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: dict, parent: "Span" = None) -> None:
+        self.name       = name
+        self.attributes = attributes
+        self.span_id    = next(tracer._ids)
+        self.parent_id  = getattr(parent, "span_id", None)
+        self.thread_id  = threading.get_ident()
+        self.start      = 0.0
+        self.duration   = 0.0
+
+        self._tracer = tracer
+
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+
+    def __enter__(self) -> "Span":
+        stack = self._tracer._stack()
+        if stack and self.parent_id is None:
+            self.parent_id = stack[-1].span_id
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        self.duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attributes["error"] = f"{exc_type.__name__}: {exc_value}"
+        self._tracer._stack().pop()
+        self._tracer._record(self)
+        return False
+
+
+class _NoOpSpan:
+    """
+    Returned while tracing is disabled.
+    """
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+
+    def __enter__(self) -> "_NoOpSpan":
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        return False
+
+
+_NOOP_SPAN: _NoOpSpan = _NoOpSpan()
+
+
+class Tracer:
+    """
+    Collects finished spans from all threads and exports them to 'output'.
+    """
+
+    def __init__(self, output: str) -> None:
+        self.output = output
+
+        self._ids   = itertools.count(1)
+        self._spans = []
+        self._lock  = threading.Lock()
+        self._local = threading.local()
+        self._epoch = time.perf_counter()
+        self._pid   = os.getpid()
+
+
+    def _stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+
+    def _record(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+
+    def span(self, name: str, parent: Span = None, **attributes) -> Span:
+        return Span(self, name, attributes, parent)
+
+
+    def current_span(self):
+        stack = self._stack()
+        return stack[-1] if stack else _NOOP_SPAN
+
+
+    def export(self) -> None:
+        """
+        Write all finished spans to the output file.
+        """
+        with self._lock:
+            spans = list(self._spans)
+
+        if self.output.endswith(".jsonl"):
+            with open(self.output, "w") as file:
+                for span in spans:
+                    file.write(json.dumps({
+                        "name":       span.name,
+                        "span_id":    span.span_id,
+                        "parent_id":  span.parent_id,
+                        "thread_id":  span.thread_id,
+                        "start":      span.start - self._epoch,
+                        "duration":   span.duration,
+                        "attributes": span.attributes,
+                    }, default=str) + "\n")
+            return
+
+        events = [
+            {
+                "name": span.name,
+                "cat":  span.attributes.get("component", "baseline"),
+                "ph":   "X",
+                "ts":   (span.start - self._epoch) * 1_000_000,
+                "dur":  span.duration * 1_000_000,
+                "pid":  self._pid,
+                "tid":  span.thread_id,
+                "args": {**span.attributes, "span_id": span.span_id, "parent_id": span.parent_id},
+            }
+            for span in spans
+        ]
+        with open(self.output, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file, default=str)
+
+
+_TRACER: Tracer = None
+
+
+def start(output: str) -> Tracer:
+    """
+    Start recording spans, exported to 'output' on stop() or interpreter exit.
+    """
+    global _TRACER
+    if _TRACER is not None and _TRACER.output == output:
+        return _TRACER
+    if _TRACER is not None:
+        stop()
+
+    _TRACER = Tracer(str(output))
+    atexit.register(_TRACER.export)
+    return _TRACER
+
+
+def stop() -> None:
+    """
+    Stop recording and export collected spans.
+    """
+    global _TRACER
+    if _TRACER is None:
+        return
+    tracer, _TRACER = _TRACER, None
+    atexit.unregister(tracer.export)
+    tracer.export()
+
+
+def span(name: str, parent: Span = None, **attributes):
+    """
+    Context manager timing the enclosed block.
+
+    Spans nest under the innermost open span of the current thread. Work handed to
+    another thread should pass 'parent' (see current_span()) to keep the causality.
+    """
+    if _TRACER is None:
+        return _NOOP_SPAN
+    return _TRACER.span(name, parent, **attributes)
+
+
+def current_span():
+    """
+    Innermost open span on this thread, for attaching attributes from within a traced function.
+    """
+    if _TRACER is None:
+        return _NOOP_SPAN
+    return _TRACER.current_span()
+
+
+def traced(func=None, **attributes):
+    """
+    Decorator wrapping a function (or method) in a span named after it.
+
+    Usable as '@traced' or '@traced(component="swiftDialog")'.
+    """
+    if func is None:
+        return lambda func: traced(func, **attributes)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _TRACER is None:
+            return func(*args, **kwargs)
+        with _TRACER.span(func.__name__, **attributes):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def file_size(file) -> int:
+    """
+    Size of file in bytes, or -1 if missing.
+    """
+    try:
+        return Path(file).stat().st_size
+    except OSError:
+        return -1
+
+
+def run(command: list, **kwargs) -> subprocess.CompletedProcess:
+    """
+    subprocess.run() wrapper recording a span per invocation.
+    """
+    if _TRACER is None:
+        return subprocess.run(command, **kwargs)
+
+    with _TRACER.span(f"subprocess: {Path(str(command[0])).name}", command=" ".join(str(argument) for argument in command)) as span:
+        result = subprocess.run(command, **kwargs)
+        span.set_attribute("returncode", result.returncode)
+        return result
@@ -0,0 +1,108 @@
+"""
+watch.py: File change monitoring for Baseline Builder's watch mode.
+
+Uses kqueue where available (macOS), falling back to polling otherwise.
+Either way, changes are confirmed by comparing stat signatures, so
+editors saving through atomic renames are handled.
+"""
+
+import os
+import time
+import select
+
+from pathlib import Path
+
+
+# Time to wait for further events after the first, coalescing editors writing in multiple steps.
+DEBOUNCE_INTERVAL: float = 0.1
+
+
+class FileWatcher:
+
+    def __init__(self, files: list = None, interval: float = 0.5) -> None:
+        """
+        Parameters:
+            files:    Files to monitor.
+            interval: Seconds between checks when polling.
+        """
+        self.interval = interval
+
+        self._signatures = {}
+        self.update(files or [])
+
+
+    def _signature(self, file: str) -> tuple:
+        try:
+            stat = os.stat(file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+    def update(self, files: list) -> None:
+        """
+        Replace monitored files.
+        Newly added files are recorded in their current state, previously monitored ones keep
+        their last seen state, so changes made in the meantime are still reported.
+        """
+        files = [str(Path(file).absolute()) for file in files]
+        self._signatures = {file: self._signatures[file] if file in self._signatures else self._signature(file) for file in files}
+
+
+    def _changed(self) -> list:
+        changed = []
+        for file, signature in self._signatures.items():
+            current = self._signature(file)
+            if current == signature:
+                continue
+            self._signatures[file] = current
+            changed.append(file)
+        return changed
+
+
+    def _wait_kqueue(self) -> None:
+        """
+        Block until any monitored file (or the directory of a missing file) receives a vnode event.
+        """
+        kqueue      = select.kqueue()
+        descriptors = []
+        try:
+            for file in self._signatures:
+                path = file if Path(file).exists() else str(Path(file).parent)
+                try:
+                    descriptors.append(os.open(path, os.O_RDONLY))
+                except OSError:
+                    continue
+
+            events = [
+                select.kevent(
+                    descriptor,
+                    filter=select.KQ_FILTER_VNODE,
+                    flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR,
+                    fflags=select.KQ_NOTE_WRITE | select.KQ_NOTE_EXTEND | select.KQ_NOTE_ATTRIB | select.KQ_NOTE_DELETE | select.KQ_NOTE_RENAME,
+                )
+                for descriptor in descriptors
+            ]
+            # Timeout guards against events missed between reopening descriptors.
+            kqueue.control(events, 1, max(self.interval, 1.0))
+        finally:
+            for descriptor in descriptors:
+                os.close(descriptor)
+            kqueue.close()
+
+
+    def wait(self) -> list:
+        """
+        Block until at least one monitored file changes.
+        Returns list of changed files.
+        """
+        while True:
+            if hasattr(select, "kqueue"):
+                self._wait_kqueue()
+            else:
+                time.sleep(self.interval)
+
+            time.sleep(DEBOUNCE_INTERVAL)
+            changed = self._changed()
+            if changed:
+                return changed
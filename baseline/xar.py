@@ -0,0 +1,43 @@
+"""
+xar.py: Minimal xar (flat pkg) archive parsing for Baseline Builder.
+
+Only the header and table of contents are handled, enough to locate
+files within the heap.
+"""
+
+import zlib
+import struct
+
+from xml.etree import ElementTree
+
+
+XAR_MAGIC:       bytes = b"xar!"
+XAR_HEADER:      str   = ">4sHHQQI"
+XAR_HEADER_SIZE: int   = struct.calcsize(XAR_HEADER)
+
+# Upper bound for table of contents, guards against malformed headers.
+XAR_MAX_TOC_SIZE: int = 16 * 1024 * 1024
+
+
+def archive_header_length(header: bytes) -> int:
+    """
+    Length of header and compressed table of contents, i.e. where the heap starts.
+    Returns 0 if not a xar archive.
+    """
+    if len(header) < XAR_HEADER_SIZE or header[:4] != XAR_MAGIC:
+        return 0
+    _, header_size, _, toc_length, _, _ = struct.unpack(XAR_HEADER, header[:XAR_HEADER_SIZE])
+    if toc_length > XAR_MAX_TOC_SIZE:
+        return 0
+    return header_size + toc_length
+
+
+def parse_toc(header: bytes) -> ElementTree.Element:
+    """
+    Parse table of contents from the start of a xar archive (see archive_header_length()).
+    """
+    if header[:4] != XAR_MAGIC:
+        raise Exception("Not a xar archive")
+    _, header_size, _, toc_length, _, _ = struct.unpack(XAR_HEADER, header[:XAR_HEADER_SIZE])
+    return ElementTree.fromstring(zlib.decompress(header[header_size:header_size + toc_length]))
+
@@ -0,0 +1,91 @@
+"""
+import_time.py: Startup benchmark for Baseline Builder's CLI.
+
+Runs 'python3 -X importtime' against the CLI entry point and fails if:
+- Cumulative import time of the baseline package exceeds the budget.
+- Heavy dependencies (requests, macos_pkg_builder) are loaded before first use.
+
+Usage:
+    python3 benchmarks/import_time.py
+    python3 benchmarks/import_time.py --budget-ms 30 --runs 10
+"""
+
+import sys
+import argparse
+import subprocess
+
+from pathlib import Path
+
+
+DEFAULT_BUDGET_MS: int = 50
+DEFAULT_RUNS:      int = 5
+
+DEFERRED_MODULES: list = [
+    "requests",
+    "macos_pkg_builder",
+    "baseline.core",
+]
+
+
+def _import_time(module: str) -> tuple:
+    """
+    Import module in a fresh interpreter.
+    Returns cumulative time (in microseconds) of baseline imports and the set of modules loaded.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        cwd=Path(__file__).parent.parent,
+    )
+    if result.returncode != 0:
+        raise Exception(f"Unable to import {module}: {result.stderr.decode('utf-8')}")
+
+    cumulative = 0
+    modules    = set()
+    for line in result.stderr.decode("utf-8").split("\n"):
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+
+        name = fields[2].rstrip()
+        modules.add(name.strip())
+
+        # Only top-level entries, nested ones are already part of the cumulative time.
+        if name.startswith("  "):
+            continue
+        name = name.strip()
+        if name == "baseline" or name.startswith("baseline."):
+            cumulative += int(fields[1].strip())
+
+    return cumulative, modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Verify Baseline Builder's CLI import time stays within budget.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs",      type=int,   default=DEFAULT_RUNS)
+    parser.add_argument("--module",    type=str,   default="baseline.cli")
+    args = parser.parse_args()
+
+    timings = []
+    for _ in range(args.runs):
+        cumulative, modules = _import_time(args.module)
+
+        eagerly_loaded = [module for module in DEFERRED_MODULES if module in modules]
+        if eagerly_loaded:
+            raise Exception(f"Modules should be loaded on first use, but were imported at startup: {', '.join(eagerly_loaded)}")
+
+        timings.append(cumulative / 1000)
+
+    # Best of N, avoids penalizing noisy CI runners.
+    best = min(timings)
+    print(f"Import time for {args.module}: {best:.2f}ms (best of {args.runs}, budget {args.budget_ms}ms)")
+
+    if best > args.budget_ms:
+        raise Exception(f"Import time regression: {best:.2f}ms exceeds budget of {args.budget_ms}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -26,18 +26,19 @@ setup(
     long_description=open('README.md').read(),
     long_description_content_type='text/markdown',
     url='https://github.com/ripeda/Baseline-Builder',
-    python_requires='>=3.6',
+    python_requires='>=3.7',
     packages=find_packages(include=["baseline"]),
     package_data={
         "baseline": ["*"],
     },
     entry_points={
         "console_scripts": [
-            "baseline = baseline.core:main",
+            "baseline = baseline.cli:main",
         ],
     },
     py_modules=["baseline"],
     include_package_data=True,
+    test_suite="tests",
     install_requires=open("requirements.txt", "r").readlines(),
     classifiers=[
         "Programming Language :: Python :: 3",
@@ -0,0 +1,115 @@
+"""
+test_assets.py: Lossless optimization of the sample icons.
+"""
+
+import zlib
+import struct
+import tempfile
+import unittest
+
+from pathlib import Path
+
+from baseline import assets
+
+
+SAMPLE_ICONS: Path = Path(__file__).parent.parent / "Samples" / "RIPEDA Engineering" / "Assets" / "Icons"
+
+
+def _png_chunks(data: bytes) -> list:
+    chunks = []
+    offset = len(assets.PNG_SIGNATURE)
+    while offset + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[offset:offset + 8])
+        chunk_data = data[offset + 8:offset + 8 + length]
+        crc,       = struct.unpack(">I", data[offset + 8 + length:offset + 12 + length])
+        assert crc == zlib.crc32(chunk_type + chunk_data) & 0xFFFFFFFF, f"Bad CRC for {chunk_type}"
+        chunks.append((chunk_type, chunk_data))
+        offset += 12 + length
+    return chunks
+
+
+def _png_pixels(data: bytes) -> tuple:
+    """
+    Chunks affecting rendering, with IDAT decompressed.
+    """
+    chunks = _png_chunks(data)
+    image  = zlib.decompress(b"".join(chunk_data for chunk_type, chunk_data in chunks if chunk_type == b"IDAT"))
+    others = [(chunk_type, chunk_data) for chunk_type, chunk_data in chunks if chunk_type not in [b"IDAT", *assets.PNG_DISCARDABLE_CHUNKS]]
+    return others, image
+
+
+def _icns_entries(data: bytes) -> dict:
+    magic, length = struct.unpack(">4sI", data[:8])
+    assert magic == b"icns" and length == len(data)
+    entries = {}
+    offset  = 8
+    while offset < len(data):
+        entry_type, entry_length = struct.unpack(">4sI", data[offset:offset + 8])
+        entries[entry_type] = data[offset + 8:offset + entry_length]
+        offset += entry_length
+    assert offset == len(data)
+    return entries
+
+
+class TestAssetOptimizer(unittest.TestCase):
+
+    def test_png_lossless(self) -> None:
+        for file in sorted(SAMPLE_ICONS.glob("*.png")):
+            with self.subTest(file=file.name):
+                data   = file.read_bytes()
+                result = assets.optimize_png(data)
+                self.assertLessEqual(len(result), len(data))
+                self.assertEqual(_png_pixels(result), _png_pixels(data))
+
+
+    def test_icns_lossless(self) -> None:
+        for file in sorted(SAMPLE_ICONS.glob("*.icns")):
+            with self.subTest(file=file.name):
+                original = _icns_entries(file.read_bytes())
+                result   = _icns_entries(assets.optimize_icns(file.read_bytes()))
+
+                for entry_type, entry_data in original.items():
+                    if entry_type == b"TOC ":
+                        continue
+                    if entry_type not in result:
+                        # Only legacy representations with a modern replacement may be dropped.
+                        self.assertTrue(any(modern in result for modern in assets.ICNS_SUPERSEDED_TYPES.get(entry_type, [])), entry_type)
+                        continue
+                    if entry_data.startswith(assets.PNG_SIGNATURE):
+                        self.assertEqual(_png_pixels(result[entry_type]), _png_pixels(entry_data))
+                    else:
+                        self.assertEqual(result[entry_type], entry_data)
+
+                # Table of contents must list every remaining entry, with its size.
+                if b"TOC " in result:
+                    toc = result[b"TOC "]
+                    listed = [struct.unpack(">4sI", toc[offset:offset + 8]) for offset in range(0, len(toc), 8)]
+                    self.assertEqual(listed, [(entry_type, len(entry_data) + 8) for entry_type, entry_data in result.items() if entry_type != b"TOC "])
+
+
+    def test_icns_superseded_dropped(self) -> None:
+        png     = (SAMPLE_ICONS / "Scripts-Dock.png").read_bytes()
+        entries = [(b"is32", b"\0" * 64), (b"ic04", png)]
+        toc     = b"".join(struct.pack(">4sI", entry_type, len(entry_data) + 8) for entry_type, entry_data in entries)
+        body    = b"".join(struct.pack(">4sI", entry_type, len(entry_data) + 8) + entry_data for entry_type, entry_data in [(b"TOC ", toc), *entries])
+
+        result = _icns_entries(assets.optimize_icns(struct.pack(">4sI", b"icns", len(body) + 8) + body))
+
+        self.assertEqual(list(result), [b"TOC ", b"ic04"])
+        self.assertEqual(result[b"TOC "], struct.pack(">4sI", b"ic04", len(result[b"ic04"]) + 8))
+        self.assertEqual(_png_pixels(result[b"ic04"]), _png_pixels(png))
+
+
+    def test_optimized_output_is_cache_hit(self) -> None:
+        with tempfile.TemporaryDirectory() as cache:
+            optimizer = assets.AssetOptimizer(cache)
+            data      = (SAMPLE_ICONS / "Scripts-Dock.png").read_bytes()
+            result    = optimizer._optimize_data(data, ".png")
+
+            # Already optimized input maps to itself, without recompressing.
+            self.assertTrue(optimizer._cache_path(result, ".png").exists())
+            self.assertEqual(optimizer._optimize_data(result, ".png"), result)
+
+
+if __name__ == "__main__":
+    unittest.main()
